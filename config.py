@@ -14,6 +14,31 @@ load_dotenv()
 # ============================================
 DATABASE_PATH = os.getenv('DATABASE_PATH', 'hp_pulse.db')
 
+# Write-behind queue (scraper writes are batched on a background thread)
+WRITE_QUEUE_SIZE = int(os.getenv('WRITE_QUEUE_SIZE', '1000'))         # Max pending writes
+WRITE_BATCH_SIZE = int(os.getenv('WRITE_BATCH_SIZE', '200'))          # Writes per commit
+WRITE_FLUSH_INTERVAL = float(os.getenv('WRITE_FLUSH_INTERVAL', '2'))  # Seconds
+
+# ============================================
+# RETENTION
+# ============================================
+ARCHIVE_DATABASE_PATH = os.getenv('ARCHIVE_DATABASE_PATH', 'hp_pulse_archive.db')
+
+# Leads not seen for this many days move to the archive (per signal_type)
+RETENTION_DAYS = {
+    'tender': int(os.getenv('TENDER_RETENTION_DAYS', '90')),
+    'news': int(os.getenv('NEWS_RETENTION_DAYS', '180')),
+    'directory': int(os.getenv('DIRECTORY_RETENTION_DAYS', '365')),
+}
+
+# scrape_log rows older than this are compacted into per-day summaries
+SCRAPE_LOG_RETENTION_DAYS = int(os.getenv('SCRAPE_LOG_RETENTION_DAYS', '14'))
+
+# Companies whose canonical names are at least this similar (0-1) are merged
+COMPANY_MERGE_THRESHOLD = float(os.getenv('COMPANY_MERGE_THRESHOLD', '0.92'))
+# Only print the merges the nightly job would make, without changing anything
+COMPANY_MERGE_DRY_RUN = os.getenv('COMPANY_MERGE_DRY_RUN', 'false').lower() in ('1', 'true', 'yes')
+
 # ============================================
 # SCRAPING INTERVALS (in hours)
 # ============================================
@@ -24,8 +49,26 @@ DIRECTORY_INTERVAL = int(os.getenv('DIRECTORY_INTERVAL', '24'))
 # ============================================
 # RATE LIMITING
 # ============================================
-REQUESTS_PER_SECOND = int(os.getenv('REQUESTS_PER_SECOND', '1'))  # Max 1 request per second per domain
+REQUESTS_PER_SECOND = float(os.getenv('REQUESTS_PER_SECOND', '1'))  # Max requests per second per domain (robots.txt may lower it)
 REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '15'))     # Seconds
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '4'))        # Keep-alive connections per domain
+HTTP_CACHE_DIR = os.getenv('HTTP_CACHE_DIR', '.http_cache')   # Conditional GET cache ('' disables)
+FETCH_CONCURRENCY = int(os.getenv('FETCH_CONCURRENCY', '8'))  # Hosts fetched in parallel per cycle
+MAX_RESPONSE_BYTES = int(os.getenv('MAX_RESPONSE_BYTES', str(5 * 1024 * 1024)))  # Body size cap (per-source 'max_bytes' overrides)
+HTTP2_ENABLED = os.getenv('HTTP2_ENABLED', 'false').lower() in ('1', 'true', 'yes')  # Needs httpx[http2]
+HTTP2_MAX_STREAMS = int(os.getenv('HTTP2_MAX_STREAMS', '6'))  # Concurrent streams per host connection
+ROBOTS_CACHE_TTL = int(os.getenv('ROBOTS_CACHE_TTL', '86400'))  # Seconds a stored robots.txt stays valid
+
+# Retries and circuit breaker (per domain)
+MAX_RETRIES = int(os.getenv('MAX_RETRIES', '2'))                        # Extra attempts for timeouts / 429 / 5xx
+RETRY_BACKOFF = float(os.getenv('RETRY_BACKOFF', '2'))                 # Base delay in seconds, doubled per attempt
+RETRY_BACKOFF_MAX = float(os.getenv('RETRY_BACKOFF_MAX', '30'))        # Cap on a single delay
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))  # Consecutive failures before a host is skipped
+CIRCUIT_RESET_TIMEOUT = int(os.getenv('CIRCUIT_RESET_TIMEOUT', '1800'))       # Seconds before probing a skipped host again
+
+# Record/replay of HTTP responses for offline benchmarking ('record', 'replay' or '' for live)
+HTTP_ARCHIVE_MODE = os.getenv('HTTP_ARCHIVE_MODE', '')
+HTTP_ARCHIVE_PATH = os.getenv('HTTP_ARCHIVE_PATH', 'hp_pulse_http.archive')
 
 # ============================================
 # USER AGENT
@@ -61,6 +104,11 @@ TENDER_KEYWORDS = FUEL_KEYWORDS + [
     'bid', 'contract', 'supply'
 ]
 
+# Broader sector terms the deep tender scrapers also accept
+SECTOR_KEYWORDS = [
+    'petroleum', 'oil', 'gas', 'LPG', 'chemical', 'energy', 'power'
+]
+
 NEWS_KEYWORDS = FUEL_KEYWORDS + OPERATIONAL_KEYWORDS + [
     'capex', 'capital expenditure', 'investment', 'acquisition',
     'merger', 'partnership', 'joint venture', 'MOU',
@@ -71,6 +119,7 @@ NEWS_KEYWORDS = FUEL_KEYWORDS + OPERATIONAL_KEYWORDS + [
 # ============================================
 # SOURCES CONFIGURATION
 # ============================================
+# Optional per-source keys: 'rss' (feed URL), 'max_bytes' (response size cap)
 SOURCES = {
     'tenders': {
         'interval_hours': TENDER_INTERVAL,
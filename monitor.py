@@ -7,12 +7,15 @@ View scraper statistics and recent activity
 import sqlite3
 from datetime import datetime, timedelta
 from tabulate import tabulate
+from utils.database import connect_readonly, day_bounds
+
+DB_PATH = 'hp_pulse.db'
 
 def show_dashboard():
     """Display comprehensive scraper dashboard"""
     
     try:
-        conn = sqlite3.connect('hp_pulse.db')
+        conn = connect_readonly(DB_PATH)
         c = conn.cursor()
     except sqlite3.OperationalError:
         print("\n❌ Error: Database not found!")
@@ -31,22 +34,26 @@ def show_dashboard():
     print("─" * 70)
     
     total_companies = c.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
-    total_leads = c.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
-    total_scrapes = c.execute("SELECT COUNT(*) FROM scrape_log").fetchone()[0]
+    total_leads = c.execute("SELECT IFNULL(SUM(lead_count), 0) FROM daily_lead_stats").fetchone()[0]
+    total_scrapes = c.execute("""
+        SELECT (SELECT COUNT(*) FROM scrape_log WHERE source_type != 'circuit')
+             + (SELECT IFNULL(SUM(runs), 0) FROM scrape_log_daily WHERE source_type != 'circuit')
+    """).fetchone()[0]
     
     print(f"   Total Companies:     {total_companies:,}")
     print(f"   Total Leads:         {total_leads:,}")
     print(f"   Total Scrape Runs:   {total_scrapes:,}")
     
     # Today's stats
-    today = datetime.now().date().isoformat()
+    today_start, today_end = day_bounds()
     today_leads = c.execute(
-        "SELECT COUNT(*) FROM leads WHERE DATE(scraped_at) = ?", 
-        (today,)
+        "SELECT IFNULL(SUM(lead_count), 0) FROM daily_lead_stats WHERE day = ?", 
+        (today_start,)
     ).fetchone()[0]
     today_scrapes = c.execute(
-        "SELECT COUNT(*) FROM scrape_log WHERE DATE(scraped_at) = ?",
-        (today,)
+        """SELECT COUNT(*) FROM scrape_log
+           WHERE scraped_at >= ? AND scraped_at < ? AND source_type != 'circuit'""",
+        (today_start, today_end)
     ).fetchone()[0]
     
     print(f"\n   📅 Today's Activity:")
@@ -60,9 +67,10 @@ def show_dashboard():
     print("─" * 70)
     
     lead_types = c.execute("""
-        SELECT signal_type, COUNT(*) as count
-        FROM leads
+        SELECT signal_type, SUM(lead_count) as count
+        FROM daily_lead_stats
         GROUP BY signal_type
+        HAVING count > 0
         ORDER BY count DESC
     """).fetchall()
     
@@ -116,12 +124,12 @@ def show_dashboard():
             time_str = dt.strftime("%m-%d %H:%M")
             
             # Status emoji
-            status_emoji = "✅" if status == "success" else "❌"
+            status_emoji = "✅" if status in ("success", "circuit_closed") else "❌"
             
             # Truncate source name
             source_short = source[:35]
             
-            table_data.append([source_short, time_str, f"{status_emoji} {status[:10]}", items])
+            table_data.append([source_short, time_str, f"{status_emoji} {status[:14]}", items])
         
         print(tabulate(table_data, 
                        headers=["Source", "Time", "Status", "Items"],
@@ -142,7 +150,7 @@ def show_dashboard():
             COUNT(*) as total,
             SUM(CASE WHEN status = 'success' THEN 1 ELSE 0 END) as successes
         FROM scrape_log
-        WHERE scraped_at > ?
+        WHERE scraped_at > ? AND source_type != 'circuit'
     """, (yesterday,)).fetchone()
     
     if stats_24h[0] > 0:
@@ -151,18 +159,45 @@ def show_dashboard():
     else:
         print("   Last 24 hours: No scrapes yet")
     
-    # Overall
+    # Overall (including runs compacted into scrape_log_daily)
     stats_all = c.execute("""
-        SELECT 
-            COUNT(*) as total,
-            SUM(CASE WHEN status = 'success' THEN 1 ELSE 0 END) as successes
-        FROM scrape_log
+        SELECT SUM(total), SUM(successes) FROM (
+            SELECT 
+                COUNT(*) as total,
+                SUM(CASE WHEN status = 'success' THEN 1 ELSE 0 END) as successes
+            FROM scrape_log
+            WHERE source_type != 'circuit'
+            UNION ALL
+            SELECT IFNULL(SUM(runs), 0), IFNULL(SUM(successes), 0)
+            FROM scrape_log_daily
+            WHERE source_type != 'circuit'
+        )
     """).fetchone()
     
     if stats_all[0] > 0:
         success_rate_all = (stats_all[1] / stats_all[0]) * 100
         print(f"   Overall:       {success_rate_all:.1f}% ({stats_all[1]}/{stats_all[0]} successful)")
     
+    # ============================================
+    # CIRCUIT BREAKERS
+    # ============================================
+    # Latest breaker event per domain; 'circuit_open' means the host is being skipped
+    open_circuits = c.execute("""
+        SELECT source_name, scraped_at, error_message
+        FROM scrape_log s
+        WHERE source_type = 'circuit' AND status = 'circuit_open'
+          AND scraped_at = (SELECT MAX(scraped_at) FROM scrape_log
+                            WHERE source_type = 'circuit' AND source_name = s.source_name)
+        ORDER BY scraped_at DESC
+    """).fetchall()
+    
+    if open_circuits:
+        print("\n⛔ HOSTS WITH OPEN CIRCUIT")
+        print("─" * 70)
+        for domain, timestamp, error in open_circuits:
+            dt = datetime.fromisoformat(timestamp)
+            print(f"   {domain[:40]:<40} since {dt.strftime('%m-%d %H:%M')}  {(error or '')[:40]}")
+    
     # ============================================
     # RECENT LEADS
     # ============================================
@@ -209,15 +244,15 @@ def show_dashboard():
 def show_quick_stats():
     """Show quick one-line stats"""
     try:
-        conn = sqlite3.connect('hp_pulse.db')
+        conn = connect_readonly(DB_PATH)
         c = conn.cursor()
         
         total_companies = c.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
-        total_leads = c.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+        total_leads = c.execute("SELECT IFNULL(SUM(lead_count), 0) FROM daily_lead_stats").fetchone()[0]
         
-        today = datetime.now().date().isoformat()
+        today, _ = day_bounds()
         today_leads = c.execute(
-            "SELECT COUNT(*) FROM leads WHERE DATE(scraped_at) = ?", 
+            "SELECT IFNULL(SUM(lead_count), 0) FROM daily_lead_stats WHERE day = ?", 
             (today,)
         ).fetchone()[0]
         
@@ -227,16 +262,90 @@ def show_quick_stats():
     except:
         print("HP-Pulse: Database not initialized")
 
-def export_to_csv(filename='leads_export.csv'):
-    """Export leads to CSV file"""
+def search_leads(query, limit=20):
+    """Full-text search over lead signal text, best matches first"""
+    try:
+        conn = connect_readonly(DB_PATH)
+    except sqlite3.OperationalError:
+        print("\n❌ Error: Database not found!")
+        return
+    
+    sql = """
+        SELECT l.id, c.name, l.signal_type, l.scraped_at,
+               snippet(leads_fts, 0, '[', ']', '…', 12) as excerpt
+        FROM leads_fts
+        JOIN leads l ON l.id = leads_fts.rowid
+        LEFT JOIN companies c ON c.id = l.company_id
+        WHERE leads_fts MATCH ?
+        ORDER BY bm25(leads_fts)
+        LIMIT ?
+    """
+    
+    try:
+        results = conn.execute(sql, (query, limit)).fetchall()
+    except sqlite3.OperationalError:
+        # Not valid FTS5 query syntax: search the words as plain terms
+        terms = ' '.join('"' + word.replace('"', '""') + '"' for word in query.split())
+        try:
+            results = conn.execute(sql, (terms, limit)).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"\n❌ Search failed: {e}")
+            conn.close()
+            return
+    
+    print(f"\n🔎 SEARCH: {query}")
+    print("─" * 70)
+    
+    if results:
+        table_data = []
+        for lead_id, company, sig_type, timestamp, excerpt in results:
+            dt = datetime.fromisoformat(timestamp)
+            table_data.append([lead_id, (company or '')[:30], sig_type,
+                               dt.strftime("%m-%d %H:%M"), excerpt.replace('\n', ' ')])
+        
+        print(tabulate(table_data,
+                       headers=["ID", "Company", "Type", "Time", "Match"],
+                       tablefmt="simple"))
+    else:
+        print("   No matching leads")
+    print()
+    
+    conn.close()
+
+EXPORT_COLUMNS = [
+    ('id', 'ID'),
+    ('company_name', 'Company'),
+    ('industry', 'Industry'),
+    ('location', 'Location'),
+    ('signal_type', 'Signal Type'),
+    ('signal_text', 'Signal Text'),
+    ('source_name', 'Source'),
+    ('source_url', 'Source URL'),
+    ('confidence', 'Confidence'),
+    ('scraped_at', 'Scraped At'),
+]
+
+EXPORT_CHUNK_SIZE = 1000
+
+def export_leads(filename='leads_export.csv', fmt=None, since=0):
+    """
+    Stream leads to a CSV or JSON Lines file.
+    
+    Rows are read from a cursor and written in chunks, oldest id first, so
+    memory use does not grow with the database. Only leads with id > since
+    are exported; the highest exported id is printed as the next watermark.
+    """
     import csv
+    import json
+    
+    fmt = fmt or ('jsonl' if filename.endswith(('.jsonl', '.ndjson')) else 'csv')
     
     try:
-        conn = sqlite3.connect('hp_pulse.db')
+        conn = connect_readonly(DB_PATH)
         c = conn.cursor()
         
-        # Get all leads with company information
-        leads = c.execute("""
+        # Leads with company information, in watermark order
+        c.execute("""
             SELECT 
                 l.id,
                 c.name as company_name,
@@ -250,38 +359,70 @@ def export_to_csv(filename='leads_export.csv'):
                 l.scraped_at
             FROM leads l
             JOIN companies c ON l.company_id = c.id
-            ORDER BY l.scraped_at DESC
-        """).fetchall()
+            WHERE l.id > ?
+            ORDER BY l.id
+        """, (since,))
         
-        if not leads:
-            print("No leads to export")
+        rows = c.fetchmany(EXPORT_CHUNK_SIZE)
+        if not rows:
+            print(f"No leads to export (watermark: {since})")
             conn.close()
-            return
+            return since
+        
+        exported = 0
+        watermark = since
+        keys = [key for key, _ in EXPORT_COLUMNS]
         
-        # Write to CSV
         with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['ID', 'Company', 'Industry', 'Location', 'Signal Type', 
-                           'Signal Text', 'Source', 'Source URL', 'Confidence', 'Scraped At'])
-            writer.writerows(leads)
+            if fmt == 'csv':
+                writer = csv.writer(f)
+                writer.writerow([header for _, header in EXPORT_COLUMNS])
+            
+            while rows:
+                if fmt == 'csv':
+                    writer.writerows(rows)
+                else:
+                    f.writelines(json.dumps(dict(zip(keys, row)), ensure_ascii=False) + '\n'
+                                 for row in rows)
+                
+                exported += len(rows)
+                watermark = rows[-1][0]
+                rows = c.fetchmany(EXPORT_CHUNK_SIZE)
         
-        print(f"\n✅ Exported {len(leads)} leads to {filename}")
+        print(f"\n✅ Exported {exported} leads to {filename}")
+        print(f"   Next watermark: --since {watermark}")
         conn.close()
+        return watermark
         
     except Exception as e:
         print(f"\n❌ Export failed: {e}")
+        return since
+
+def export_to_csv(filename='leads_export.csv', since=0):
+    """Export leads to CSV file"""
+    return export_leads(filename, fmt='csv', since=since)
 
 if __name__ == "__main__":
-    import sys
-    
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--quick":
-            show_quick_stats()
-        elif sys.argv[1] == "--export":
-            filename = sys.argv[2] if len(sys.argv) > 2 else 'leads_export.csv'
-            export_to_csv(filename)
-        else:
-            show_dashboard()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="HP-Pulse monitoring dashboard")
+    parser.add_argument('--quick', action='store_true', help="one-line stats")
+    parser.add_argument('--export', nargs='?', const='leads_export.csv', metavar='FILE',
+                        help="export leads (default: leads_export.csv)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'],
+                        help="export format (default: from file extension, else csv)")
+    parser.add_argument('--search', metavar='QUERY',
+                        help="full-text search of leads (FTS5 syntax, e.g. 'NEAR(bitumen vizag)')")
+    parser.add_argument('--limit', type=int, default=20, help="max search results")
+    parser.add_argument('--since', type=int, default=0, metavar='LEAD_ID',
+                        help="only export leads with id greater than this watermark")
+    args = parser.parse_args()
+    
+    if args.quick:
+        show_quick_stats()
+    elif args.search:
+        search_leads(args.search, limit=args.limit)
+    elif args.export:
+        export_leads(args.export, fmt=args.format, since=args.since)
     else:
         show_dashboard()
-
@@ -15,11 +15,16 @@ from datetime import datetime
 import sys
 
 # Import configuration
-from config import SOURCES
+from config import SOURCES, WRITE_QUEUE_SIZE, WRITE_BATCH_SIZE, WRITE_FLUSH_INTERVAL
+from config import ARCHIVE_DATABASE_PATH, RETENTION_DAYS, SCRAPE_LOG_RETENTION_DAYS
+from config import COMPANY_MERGE_THRESHOLD, COMPANY_MERGE_DRY_RUN
+from config import HTTP_ARCHIVE_MODE, HTTP_ARCHIVE_PATH
 
 # Import utilities
 from utils.database import Database
 from utils.compliance import ComplianceChecker
+from utils.http_archive import HttpArchive
+from utils.write_behind import WriteBehindWriter
 
 # Import scrapers
 from scrapers.tender_scraper import TenderScraper
@@ -37,16 +42,25 @@ class HPPulseScraper:
         print("\n📦 Setting up database...")
         self.db = Database()
         
+        # Scrapers write through a background queue so parsing never waits on disk
+        self.writer = WriteBehindWriter(
+            self.db,
+            max_queue=WRITE_QUEUE_SIZE,
+            batch_size=WRITE_BATCH_SIZE,
+            flush_interval=WRITE_FLUSH_INTERVAL
+        )
+        
         # Initialize compliance checker
         print("🛡️  Setting up compliance checker...")
-        self.checker = ComplianceChecker()
+        archive = HttpArchive(HTTP_ARCHIVE_PATH, HTTP_ARCHIVE_MODE) if HTTP_ARCHIVE_MODE else None
+        self.checker = ComplianceChecker(db=self.db, archive=archive)
         
         # Initialize scrapers
         print("🕷️  Setting up scrapers...")
-        self.tender_scraper = TenderScraper(self.db, self.checker)
-        self.news_scraper = NewsScraper(self.db, self.checker)
-        self.directory_scraper = DirectoryScraper(self.db, self.checker)
-        self.selenium_scraper = SeleniumScraper(self.db, self.checker)
+        self.tender_scraper = TenderScraper(self.writer, self.checker)
+        self.news_scraper = NewsScraper(self.writer, self.checker)
+        self.directory_scraper = DirectoryScraper(self.writer, self.checker)
+        self.selenium_scraper = SeleniumScraper(self.writer, self.checker)
         print("✅ Tender scraper initialized")
         print("✅ News scraper initialized")
         print("✅ Directory scraper initialized")
@@ -61,8 +75,9 @@ class HPPulseScraper:
             sources = SOURCES['tenders']['sources']
             self.tender_scraper.scrape_all(sources)
             
-            # Run Selenium deep scraping
-            self.scrape_tenders_selenium()
+            # Run Selenium deep scraping (drives a live browser, so not when replaying)
+            if not self.checker.replaying:
+                self.scrape_tenders_selenium()
         except Exception as e:
             print(f"❌ Error in tender scraping: {e}")
     
@@ -77,7 +92,8 @@ class HPPulseScraper:
             
             if selenium_sources:
                 for source in selenium_sources:
-                    self.selenium_scraper.scrape_cpp_portal_tenders(source)
+                    with self.writer.transaction():
+                        self.selenium_scraper.scrape_cpp_portal_tenders(source)
                 
                 # Close driver after all selenium scraping
                 self.selenium_scraper.close_driver()
@@ -100,6 +116,20 @@ class HPPulseScraper:
         except Exception as e:
             print(f"❌ Error in directory scraping: {e}")
     
+    def run_maintenance(self):
+        """Job: Archive old leads, compact scrape_log, merge duplicate companies, reclaim space"""
+        try:
+            print("\n🧹 Running database maintenance...")
+            self.writer.flush()
+            self.db.apply_retention(
+                ARCHIVE_DATABASE_PATH,
+                RETENTION_DAYS,
+                scrape_log_days=SCRAPE_LOG_RETENTION_DAYS
+            )
+            self.db.merge_duplicate_companies(COMPANY_MERGE_THRESHOLD, dry_run=COMPANY_MERGE_DRY_RUN)
+        except Exception as e:
+            print(f"❌ Error in database maintenance: {e}")
+    
     def print_schedule(self):
         """Print scraping schedule"""
         print("\n" + "=" * 70)
@@ -146,6 +176,49 @@ class HPPulseScraper:
         print()
         print("=" * 70)
     
+    def load_robots(self):
+        """Load robots.txt for every configured domain up front, in parallel"""
+        print("\n🤖 Loading robots.txt...")
+        source_urls = [url
+                       for category in SOURCES.values()
+                       for source in category['sources']
+                       for url in (source.get('url'), source.get('rss')) if url]
+        domains = self.checker.prefetch_robots(source_urls)
+        print(f"✅ robots.txt ready for {domains} domains")
+    
+    def run_once(self):
+        """Run a single scrape cycle, report per-stage timings and exit (benchmarking)"""
+        timings = {}
+        
+        try:
+            started = time.perf_counter()
+            self.load_robots()
+            timings['robots.txt'] = time.perf_counter() - started
+            
+            for stage, job in (('tenders', self.scrape_tenders),
+                               ('news', self.scrape_news),
+                               ('directories', self.scrape_directories)):
+                started = time.perf_counter()
+                job()
+                timings[stage] = time.perf_counter() - started
+        finally:
+            # Flush whatever was scraped even if a stage was interrupted
+            started = time.perf_counter()
+            self.writer.close()
+            timings['db flush'] = time.perf_counter() - started
+            self.checker.close()
+        
+        stats = self.db.get_stats()
+        print("\n" + "=" * 70)
+        print("⏱️  SINGLE CYCLE COMPLETE")
+        print("=" * 70)
+        for stage, seconds in timings.items():
+            print(f"   {stage:<16} {seconds:8.2f}s")
+        print(f"   {'total':<16} {sum(timings.values()):8.2f}s")
+        print(f"   Total Leads:     {stats['total_leads']}")
+        print("=" * 70)
+        self.db.close()
+    
     def run(self):
         """Start the scheduler"""
         self.print_schedule()
@@ -155,33 +228,36 @@ class HPPulseScraper:
         schedule.every(SOURCES['tenders']['interval_hours']).hours.do(self.scrape_tenders)
         schedule.every(SOURCES['news']['interval_hours']).hours.do(self.scrape_news)
         schedule.every(SOURCES['directories']['interval_hours']).hours.do(self.scrape_directories)
-        
-        # Run immediately on start
-        print("\n🔄 Running initial scrape cycle...")
-        print("   This may take a few minutes...\n")
-        
-        self.scrape_tenders()
-        self.scrape_news()
-        self.scrape_directories()
-        
-        # Show summary
-        stats = self.db.get_stats()
-        print("\n" + "=" * 70)
-        print("📊 INITIAL SCRAPE COMPLETE")
-        print("=" * 70)
-        print(f"   Total Companies: {stats['total_companies']}")
-        print(f"   Total Leads:     {stats['total_leads']}")
-        print()
-        
-        # Keep running
-        print("=" * 70)
-        print("🔄 Scheduler now running...")
-        print("   Next scrapes will run according to schedule")
-        print("   Press Ctrl+C to stop")
-        print("=" * 70)
-        print()
+        schedule.every().day.at("03:00").do(self.run_maintenance)
         
         try:
+            self.load_robots()
+            
+            # Run immediately on start
+            print("\n🔄 Running initial scrape cycle...")
+            print("   This may take a few minutes...\n")
+            
+            self.scrape_tenders()
+            self.scrape_news()
+            self.scrape_directories()
+            
+            # Show summary
+            stats = self.writer.get_stats()
+            print("\n" + "=" * 70)
+            print("📊 INITIAL SCRAPE COMPLETE")
+            print("=" * 70)
+            print(f"   Total Companies: {stats['total_companies']}")
+            print(f"   Total Leads:     {stats['total_leads']}")
+            print()
+            
+            # Keep running
+            print("=" * 70)
+            print("🔄 Scheduler now running...")
+            print("   Next scrapes will run according to schedule")
+            print("   Press Ctrl+C to stop")
+            print("=" * 70)
+            print()
+            
             while True:
                 schedule.run_pending()
                 time.sleep(60)  # Check every minute
@@ -189,6 +265,10 @@ class HPPulseScraper:
             print("\n\n" + "=" * 70)
             print("👋 HP-Pulse Scraper stopped by user")
             
+            # Persist everything still queued before reporting
+            self.writer.close()
+            self.checker.close()
+            
             # Final stats
             final_stats = self.db.get_stats()
             print()
@@ -196,21 +276,46 @@ class HPPulseScraper:
             print(f"   Total Companies: {final_stats['total_companies']}")
             print(f"   Total Leads:     {final_stats['total_leads']}")
             print(f"   Today's Leads:   {final_stats['today_leads']}")
+            
+            rate_stats = self.checker.rate_limit_stats().values()
+            total_requests = sum(s['requests'] for s in rate_stats)
+            total_wait = sum(s['total_wait'] for s in rate_stats)
+            print(f"   HTTP Requests:   {total_requests} ({total_wait:.1f}s rate-limit wait)")
+            
+            transfer_stats = self.checker.transfer_stats().values()
+            total_bytes = sum(s['bytes'] for s in transfer_stats)
+            rejected = sum(s['rejected'] for s in transfer_stats)
+            print(f"   Downloaded:      {total_bytes / 1024 / 1024:.1f} MB ({rejected} oversized/unsupported refused)")
             print()
             print("   Data saved to: hp_pulse.db")
             print("   Run 'python monitor.py' to view dashboard")
             print("=" * 70)
+            self.db.close()
             sys.exit(0)
+        finally:
+            # Ctrl+C mid-cycle or a fatal error must not drop queued writes
+            self.writer.close()
+            self.checker.close()
 
 def main():
     """Main entry point"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="HP-Pulse Scraper")
+    parser.add_argument('--once', action='store_true',
+                        help="run one scrape cycle and exit (use with HTTP_ARCHIVE_MODE)")
+    args = parser.parse_args()
+    
     print("\n🌟 Welcome to HP-Pulse Scraper!")
     print("   Developed for HPCL Productathon 2026")
     print()
     
     try:
         scraper = HPPulseScraper()
-        scraper.run()
+        if args.once:
+            scraper.run_once()
+        else:
+            scraper.run()
     except Exception as e:
         print(f"\n❌ Fatal error: {e}")
         print("   Please check your configuration and try again")
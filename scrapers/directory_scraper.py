@@ -3,23 +3,38 @@ Directory Scraper for HP-Pulse
 Scrapes business directories for company listings
 """
 
-from bs4 import BeautifulSoup
 from datetime import datetime
 import re
+from utils.fetch_engine import FetchEngine, NOT_FETCHED, handle_not_modified
+from utils.html_parse import parse_html, strainer
+from utils.keyword_matcher import KEYWORDS
+
+# Listing selectors; pages are parsed into just these subtrees
+INDIAMART_LISTING_CLASS = re.compile(r'company|seller|supplier|list')
+INDIAMART_LINK_HREF = re.compile(r'company|proddetail')
+INDIAMART_STRAINER = strainer((('div', 'li'), 'class', INDIAMART_LISTING_CLASS),
+                              (('a',), 'href', INDIAMART_LINK_HREF))
+
+TRADEINDIA_LISTING_CLASS = re.compile(r'product|seller|company|listing')
+TRADEINDIA_LINK_HREF = re.compile(r'seller|company')
+TRADEINDIA_STRAINER = strainer((('div', 'li'), 'class', TRADEINDIA_LISTING_CLASS),
+                               (('a',), 'href', TRADEINDIA_LINK_HREF))
 
 class DirectoryScraper:
     def __init__(self, db, compliance_checker):
         self.db = db
         self.checker = compliance_checker
+        self.engine = FetchEngine(compliance_checker)
         print("✅ Directory scraper initialized")
     
-    def scrape_indiamart(self, source):
+    def scrape_indiamart(self, source, response=NOT_FETCHED):
         """Scrape IndiaMART directory"""
         print(f"\n📋 Scraping: {source['name']}")
         print(f"   URL: {source['url']}")
         
         try:
-            response = self.checker.make_request(source['url'])
+            if response is NOT_FETCHED:
+                response = self.checker.make_request(source['url'], max_bytes=source.get('max_bytes'))
             if not response:
                 self.db.log_scrape(
                     source_name=source['name'],
@@ -30,15 +45,18 @@ class DirectoryScraper:
                 )
                 return 0
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            if response.not_modified:
+                return handle_not_modified(self.db, source, 'directory')
+            
+            soup = parse_html(response.content, INDIAMART_STRAINER)
             
             # Try to find company listings
             # IndiaMART structure may vary, these are common selectors
-            companies = soup.find_all(['div', 'li'], class_=re.compile(r'company|seller|supplier|list'))
+            companies = soup.find_all(['div', 'li'], class_=INDIAMART_LISTING_CLASS)
             
             if not companies:
                 # Try alternative: find company names in links
-                companies = soup.find_all('a', href=re.compile(r'company|proddetail'))
+                companies = soup.find_all('a', href=INDIAMART_LINK_HREF)
             
             print(f"   Found {len(companies)} potential company listings")
             
@@ -97,7 +115,9 @@ class DirectoryScraper:
                     signal_type='directory',
                     source_name=source['name'],
                     source_url=source['url'],
-                    confidence=0.3
+                    confidence=0.3,
+                    dedupe_key=company_name,
+                    products=KEYWORDS.match(comp.get_text(' ')).products
                 )
                 
                 items_found += 1
@@ -113,6 +133,7 @@ class DirectoryScraper:
                 status='success',
                 items_found=items_found
             )
+            self.db.after_commit(self.checker.commit_cache, source['url'])
             
             print(f"   📊 Total companies found: {items_found}")
             return items_found
@@ -128,13 +149,14 @@ class DirectoryScraper:
             )
             return 0
     
-    def scrape_tradeindia(self, source):
+    def scrape_tradeindia(self, source, response=NOT_FETCHED):
         """Scrape TradeIndia directory"""
         print(f"\n📋 Scraping: {source['name']}")
         print(f"   URL: {source['url']}")
         
         try:
-            response = self.checker.make_request(source['url'])
+            if response is NOT_FETCHED:
+                response = self.checker.make_request(source['url'], max_bytes=source.get('max_bytes'))
             if not response:
                 self.db.log_scrape(
                     source_name=source['name'],
@@ -145,13 +167,16 @@ class DirectoryScraper:
                 )
                 return 0
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            if response.not_modified:
+                return handle_not_modified(self.db, source, 'directory')
+            
+            soup = parse_html(response.content, TRADEINDIA_STRAINER)
             
             # TradeIndia common selectors
-            companies = soup.find_all(['div', 'li'], class_=re.compile(r'product|seller|company|listing'))
+            companies = soup.find_all(['div', 'li'], class_=TRADEINDIA_LISTING_CLASS)
             
             if not companies:
-                companies = soup.find_all('a', href=re.compile(r'seller|company'))
+                companies = soup.find_all('a', href=TRADEINDIA_LINK_HREF)
             
             print(f"   Found {len(companies)} potential company listings")
             
@@ -188,7 +213,9 @@ class DirectoryScraper:
                     signal_type='directory',
                     source_name=source['name'],
                     source_url=source['url'],
-                    confidence=0.3
+                    confidence=0.3,
+                    dedupe_key=company_name,
+                    products=KEYWORDS.match(comp.get_text(' ')).products
                 )
                 
                 items_found += 1
@@ -204,6 +231,7 @@ class DirectoryScraper:
                 status='success',
                 items_found=items_found
             )
+            self.db.after_commit(self.checker.commit_cache, source['url'])
             
             print(f"   📊 Total companies found: {items_found}")
             return items_found
@@ -228,18 +256,31 @@ class DirectoryScraper:
         
         total_items = 0
         
+        # Fetch every enabled directory page concurrently, then parse in order
+        pages = self.engine.fetch_sources(
+            s for s in sources
+            if s.get('enabled', True) and ('indiamart' in s['url'].lower() or 'tradeindia' in s['url'].lower())
+        )
+        
         for source in sources:
             if not source.get('enabled', True):
                 print(f"\n⏭️  Skipping (disabled): {source['name']}")
                 continue
             
-            if 'indiamart' in source['url'].lower():
-                items = self.scrape_indiamart(source)
-            elif 'tradeindia' in source['url'].lower():
-                items = self.scrape_tradeindia(source)
-            else:
-                print(f"\n⚠️  No scraper implemented for: {source['name']}")
-                items = 0
+            response = pages.get(source['url'])
+            if isinstance(response, Exception):
+                print(f"\n❌ Fetch failed for {source['name']}: {response}")
+                response = None
+            
+            # One transaction per source run
+            with self.db.transaction():
+                if 'indiamart' in source['url'].lower():
+                    items = self.scrape_indiamart(source, response)
+                elif 'tradeindia' in source['url'].lower():
+                    items = self.scrape_tradeindia(source, response)
+                else:
+                    print(f"\n⚠️  No scraper implemented for: {source['name']}")
+                    items = 0
             
             total_items += items
         
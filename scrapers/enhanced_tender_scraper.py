@@ -4,20 +4,22 @@ Scrapes actual tender details including organization, value, dates
 Based on browser research of portal structure
 """
 
-import requests
-from bs4 import BeautifulSoup
 import re
 from datetime import datetime
-import time
+from utils.fetch_engine import FetchEngine
+from utils.html_parse import parse_html, strainer
+from utils.keyword_matcher import KEYWORDS
+
+# Organisation and tender listings are plain tables
+TABLES_ONLY = strainer((('table',), None, None))
 
 class EnhancedTenderScraper:
     def __init__(self, db, compliance_checker):
         self.db = db
         self.compliance = compliance_checker
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)'
-        })
+        # Organisation pages all live on eprocure.gov.in; with HTTP2_ENABLED they
+        # are multiplexed over one connection instead of fetched one by one
+        self.engine = FetchEngine(compliance_checker)
     
     def scrape_cpp_tenders_by_organization(self):
         """
@@ -34,13 +36,13 @@ class EnhancedTenderScraper:
         try:
             # Step 1: Get organizations list page
             print(f"   📋 Fetching organizations list...")
-            response = self.session.get(org_page_url, verify=False, timeout=15)
+            response = self.compliance.make_request(org_page_url)
             
-            if response.status_code != 200:
+            if not response:
                 print(f"   ❌ Failed to fetch organizations page")
                 return 0
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = parse_html(response.content, TABLES_ONLY)
             
             # Step 2: Find organization links with tender counts
             # Look for table with organizations
@@ -71,18 +73,24 @@ class EnhancedTenderScraper:
             
             print(f"   📊 Found {len(organizations)} organizations with active tenders")
             
-            # Step 3: For each organization, fetch their tenders
-            for org in organizations[:3]:  # Limit to 3 orgs for now
-                print(f"\n   🏢 Organization: {org['name']} ({org['count']} tenders)")
-                
+            # Step 3: Fetch the organizations' tender pages together (rate limited per host)
+            organizations = organizations[:3]  # Limit to 3 orgs for now
+            for org in organizations:
                 # Construct full URL for organization's tenders
-                org_tender_url = f"{base_url}{org['url']}" if org['url'].startswith('?') else org['url']
-                
-                time.sleep(1)  # Rate limiting
+                org['tender_url'] = f"{base_url}{org['url']}" if org['url'].startswith('?') else org['url']
+            pages = self.engine.fetch_urls(org['tender_url'] for org in organizations)
+            
+            for org in organizations:
+                print(f"\n   🏢 Organization: {org['name']} ({org['count']} tenders)")
+                org_tender_url = org['tender_url']
                 
                 try:
-                    org_response = self.session.get(org_tender_url, verify=False, timeout=15)
-                    org_soup = BeautifulSoup(org_response.content, 'html.parser')
+                    org_response = pages.get(org_tender_url)
+                    if isinstance(org_response, Exception):
+                        raise org_response
+                    if not org_response:
+                        continue
+                    org_soup = parse_html(org_response.content, TABLES_ONLY)
                     
                     # Find tender listing table
                     tender_tables = org_soup.find_all('table')
@@ -116,7 +124,8 @@ class EnhancedTenderScraper:
                                 
                                 # Check if relevant to fuel/petroleum
                                 full_text = f"{tender_title} {org['name']}"
-                                if self.is_fuel_related(full_text):
+                                hits = KEYWORDS.match(full_text)
+                                if hits.any('fuel', 'product', 'sector'):
                                     # Insert into database
                                     company_id = self.db.insert_company(
                                         name=org['name'],
@@ -136,7 +145,9 @@ class EnhancedTenderScraper:
                                         signal_type='tender',
                                         source_name='CPP Portal - Enhanced Scraper',
                                         source_url=org_tender_url,
-                                        confidence=0.90
+                                        confidence=0.90,
+                                        dedupe_key=tender_ref if tender_ref != "N/A" else f"{org['name']} {tender_title}",
+                                        products=hits.products
                                     )
                                     
                                     tenders_found += 1
@@ -152,9 +163,3 @@ class EnhancedTenderScraper:
         except Exception as e:
             print(f"   ❌ Error: {e}")
             return 0
-    
-    def is_fuel_related(self, text):
-        """Check if tender is related to fuel/petroleum/chemicals"""
-        keywords = ['fuel', 'petroleum', 'diesel', 'petrol', 'oil', 'gas', 'lpg', 'chemical', 'energy']
-        text_lower = text.lower()
-        return any(kw in text_lower for kw in keywords)
@@ -4,61 +4,98 @@ Scrapes news sources using RSS feeds and HTML parsing
 """
 
 import feedparser
-from bs4 import BeautifulSoup
 from datetime import datetime
 import re
-from config import FUEL_KEYWORDS, OPERATIONAL_KEYWORDS
 from utils.company_extractor import CompanyExtractor
+from utils.feed_reader import read_feed_entries
+from utils.fetch_engine import FetchEngine, NOT_FETCHED, handle_not_modified
+from utils.html_parse import parse_html, strainer
+from utils.keyword_matcher import KEYWORDS
+
+RSS_ENTRY_LIMIT = 20
+
+# Article selectors for HTML news pages; pages are parsed into just these subtrees
+ARTICLE_CLASS = re.compile(r'story|article|news|post')
+ARTICLE_HREF = re.compile(r'/news/|/article/|/story/')
+ARTICLE_STRAINER = strainer((('article', 'div'), 'class', ARTICLE_CLASS),
+                            (('a',), 'href', ARTICLE_HREF))
+
+# A name written out with its suffix ('Acme Chemicals Ltd') beats any other guess
+SUFFIXED_NAME_PATTERN = re.compile(
+    r'([A-Z][a-zA-Z\s&]+(?:Ltd|Limited|Corporation|Corp|Inc|Industries|Chemicals|Petroleum|Energy|Power|Textiles))'
+)
+
+# Common patterns for Indian company names, for headlines naming no known company
+COMPANY_NAME_PATTERNS = [
+    re.compile(r'([A-Z][a-zA-Z]+\s+[A-Z][a-zA-Z]+)\s+(?:announced|plans|to|expansion|commissioning)'),
+    re.compile(r'(Tata|Reliance|Adani|Birla|Vedanta|JSW|Essar|Ambuja|UltraTech)\s+[A-Z][a-zA-Z]+'),
+]
 
 class NewsScraper:
     def __init__(self, db, compliance_checker):
         self.db = db
         self.checker = compliance_checker
+        self.engine = FetchEngine(compliance_checker)
         print("✅ News scraper initialized")
     
     def is_relevant(self, text):
-        """Check if text mentions relevant keywords"""
-        text_lower = text.lower()
-        
-        # Check for fuel keywords
-        fuel_match = any(kw.lower() in text_lower for kw in FUEL_KEYWORDS)
-        
-        # Check for operational keywords
-        ops_match = any(kw.lower() in text_lower for kw in OPERATIONAL_KEYWORDS)
-        
-        return fuel_match or ops_match
+        """Check if text mentions fuel/operational keywords or a product"""
+        return KEYWORDS.match(text).any('fuel', 'operational', 'product')
     
     def extract_company_name(self, title, summary):
         """Try to extract company name from news"""
         text = f"{title} {summary}"
         
-        # Common patterns for Indian company names
-        patterns = [
-            r'([A-Z][a-zA-Z\s&]+(?:Ltd|Limited|Corporation|Corp|Inc|Industries|Chemicals|Petroleum|Energy|Power|Textiles))',
-            r'([A-Z][a-zA-Z]+\s+[A-Z][a-zA-Z]+)\s+(?:announced|plans|to|expansion|commissioning)',
-            r'(Tata|Reliance|Adani|Birla|Vedanta|JSW|Essar|Ambuja|UltraTech)\s+[A-Z][a-zA-Z]+',
-        ]
+        match = SUFFIXED_NAME_PATTERN.search(text)
+        if match is None:
+            # Companies we already know (listed PSUs/majors and stored suffixed names)
+            known = CompanyExtractor.find_known_companies(text)
+            if known:
+                return known[0]
+            
+            match = next(filter(None, (p.search(text) for p in COMPANY_NAME_PATTERNS)), None)
         
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                company = match.group(1).strip()
-                # Clean up
-                company = re.sub(r'\s+', ' ', company)
-                return company
+        if match:
+            company = match.group(1).strip()
+            # Clean up
+            company = re.sub(r'\s+', ' ', company)
+            return company
         
         return "Unknown Company"
     
-    def scrape_rss(self, source):
-        """Scrape RSS feed"""
+    @staticmethod
+    def fetch_url(source):
+        """URL actually fetched for a source: the declared feed if it has one"""
+        return source.get('rss', source['url'])
+    
+    def scrape_rss(self, source, response=NOT_FETCHED):
+        """Scrape RSS feed (fetched through the compliance checker)"""
+        feed_url = self.fetch_url(source)
         print(f"\n📰 Scraping RSS: {source['name']}")
-        print(f"   URL: {source['url']}")
+        print(f"   URL: {feed_url}")
         
         try:
+            if response is NOT_FETCHED:
+                response = self.checker.make_request(feed_url, max_bytes=source.get('max_bytes'))
+            if isinstance(response, Exception):
+                raise response
+            if not response:
+                self.db.log_scrape(
+                    source_name=source['name'],
+                    source_type='news',
+                    status='error',
+                    items_found=0,
+                    error='Request failed'
+                )
+                return 0
+            
+            if response.not_modified:
+                return handle_not_modified(self.db, source, 'news')
+            
             print("   Parsing RSS feed...")
-            feed = feedparser.parse(source['url'])
+            entries = read_feed_entries(response.content, limit=RSS_ENTRY_LIMIT)
             
-            if not feed.entries:
+            if not entries:
                 print("   ⚠️  No entries found in RSS feed")
                 self.db.log_scrape(
                     source_name=source['name'],
@@ -69,15 +106,16 @@ class NewsScraper:
                 return 0
             
             items_found = 0
-            for entry in feed.entries[:20]:  # Limit to 20 items
+            for entry in entries:
                 title = entry.get('title', '')
                 description = entry.get('description', '') or entry.get('summary', '')
                 
                 # Combine and check relevance
                 full_text = f"{title} {description}"
-                if self.is_relevant(full_text):
+                hits = KEYWORDS.match(full_text)
+                if hits.any('fuel', 'operational', 'product'):
                     # Extract company name
-                    company_name = self.extract_company_name(full_text)
+                    company_name = self.extract_company_name(title, description)
                     
                     company_id = self.db.insert_company(
                         name=company_name,
@@ -89,8 +127,9 @@ class NewsScraper:
                         signal_text=f"{title}\n\n{description}",
                         signal_type='news',
                         source_name=source['name'],
-                        source_url=entry.get('link', source['url']),
-                        confidence=0.65
+                        source_url=entry.get('link') or feed_url,
+                        confidence=0.65,
+                        products=hits.products
                     )
                     
                     items_found += 1
@@ -102,6 +141,7 @@ class NewsScraper:
                 status='success',
                 items_found=items_found
             )
+            self.db.after_commit(self.checker.commit_cache, feed_url)
             
             print(f"   📊 Total relevant items: {items_found}")
             return items_found
@@ -117,14 +157,47 @@ class NewsScraper:
             )
             return 0
     
-    def scrape_newsapi(self, source):
+    def fetch_newsapi(self, source):
+        """
+        Call NewsAPI (None if no API key is configured).
+        
+        Goes through the checker's HTTP archive like make_request: recorded
+        when recording, served from it (without a key) when replaying. The
+        archive key is the request URL without apiKey, so keys never reach disk.
+        """
+        from config import NEWSAPI_KEY, REQUEST_TIMEOUT
+        from urllib.parse import urlparse
+        import requests
+        
+        # Build API request
+        params = dict(source.get('params', {}))
+        archive_url = requests.Request('GET', source['url'], params=params).prepare().url
+        
+        if self.checker.replaying:
+            response = self.checker.archive.load(archive_url)
+            print(f"📼 {'Replayed' if response is not None else 'Not in archive'}: {archive_url}")
+            return response
+        
+        if not NEWSAPI_KEY:
+            return None
+        params['apiKey'] = NEWSAPI_KEY
+        
+        parsed = urlparse(source['url'])
+        session = self.checker.get_session(f"{parsed.scheme}://{parsed.netloc}")
+        response = session.get(source['url'], params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        if self.checker.archive:
+            self.checker.archive.save(archive_url, response)
+        return response
+    
+    def scrape_newsapi(self, source, response=NOT_FETCHED):
         """Scrape NewsAPI for business news"""
         print(f"\n📰 Scraping NewsAPI: {source['name']}")
         
         try:
             from config import NEWSAPI_KEY
             
-            if not NEWSAPI_KEY:
+            if not NEWSAPI_KEY and not self.checker.replaying:
                 print("   ⚠️  NewsAPI key not configured")
                 self.db.log_scrape(
                     source_name=source['name'],
@@ -135,13 +208,19 @@ class NewsScraper:
                 )
                 return 0
             
-            # Build API request
-            params = source.get('params', {})
-            params['apiKey'] = NEWSAPI_KEY
-            
-            import requests
-            response = requests.get(source['url'], params=params)
-            response.raise_for_status()
+            if response is NOT_FETCHED:
+                response = self.fetch_newsapi(source)
+            if isinstance(response, Exception):
+                raise response
+            if response is None:
+                self.db.log_scrape(
+                    source_name=source['name'],
+                    source_type='news',
+                    status='error',
+                    items_found=0,
+                    error='No response'
+                )
+                return 0
             
             data = response.json()
             
@@ -169,7 +248,8 @@ class NewsScraper:
                 # Combine for relevance check
                 full_text = f"{title} {description} {content}"
                 
-                if self.is_relevant(full_text):
+                hits = KEYWORDS.match(full_text)
+                if hits.any('fuel', 'operational', 'product'):
                     # Extract company name using CompanyExtractor
                     company_name = self.extract_company_name(title, description if description else content)
                     
@@ -193,7 +273,8 @@ class NewsScraper:
                         signal_type='news',
                         source_name=f"NewsAPI - {source_name_article}",
                         source_url=article.get('url', ''),
-                        confidence=0.70  # Higher confidence for verified news sources
+                        confidence=0.70,  # Higher confidence for verified news sources
+                        products=hits.products
                     )
                     
                     items_found += 1
@@ -285,13 +366,16 @@ class NewsScraper:
             )
             return 0
     
-    def scrape_html(self, source):
+    def scrape_html(self, source, response=NOT_FETCHED):
         """Scrape HTML-based news site"""
         print(f"\n📰 Scraping HTML: {source['name']}")
         print(f"   URL: {source['url']}")
         
         try:
-            response = self.checker.make_request(source['url'])
+            if response is NOT_FETCHED:
+                response = self.checker.make_request(source['url'], max_bytes=source.get('max_bytes'))
+            if isinstance(response, Exception):
+                raise response
             if not response:
                 self.db.log_scrape(
                     source_name=source['name'],
@@ -302,15 +386,18 @@ class NewsScraper:
                 )
                 return 0
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            if response.not_modified:
+                return handle_not_modified(self.db, source, 'news')
+            
+            soup = parse_html(response.content, ARTICLE_STRAINER)
             
             # Find article headlines (generic selectors)
-            articles = soup.find_all(['article', 'div'], class_=re.compile(r'story|article|news|post'), limit=30)
+            articles = soup.find_all(['article', 'div'], class_=ARTICLE_CLASS, limit=30)
             
             if not articles:
                 print("   ⚠️  No articles found with standard selectors")
                 # Try alternative: find all links with certain patterns
-                articles = soup.find_all('a', href=re.compile(r'/news/|/article/|/story/'))[:30]
+                articles = soup.find_all('a', href=ARTICLE_HREF)[:30]
             
             print(f"   Found {len(articles)} potential articles")
             
@@ -334,7 +421,8 @@ class NewsScraper:
                     link = urljoin(source['url'], link)
                 
                 # Check relevance
-                if self.is_relevant(title):
+                hits = KEYWORDS.match(title)
+                if hits.any('fuel', 'operational', 'product'):
                     company_name = self.extract_company_name(title, '')
                     company_id = self.db.insert_company(company_name)
                     
@@ -344,7 +432,8 @@ class NewsScraper:
                         signal_type='news',
                         source_name=source['name'],
                         source_url=link,
-                        confidence=0.5
+                        confidence=0.5,
+                        products=hits.products
                     )
                     
                     items_found += 1
@@ -356,6 +445,7 @@ class NewsScraper:
                 status='success',
                 items_found=items_found
             )
+            self.db.after_commit(self.checker.commit_cache, source['url'])
             
             print(f"   📊 Total relevant items: {items_found}")
             return items_found
@@ -371,6 +461,14 @@ class NewsScraper:
             )
             return 0
     
+    def fetcher(self, source):
+        """Blocking fetch call for a source, run by the fetch engine"""
+        if source.get('type') == 'newsapi':
+            return lambda: self.fetch_newsapi(source)
+        # The engine waits on the rate limiter before calling us
+        return lambda: self.checker.make_request(
+            self.fetch_url(source), rate_limit=False, max_bytes=source.get('max_bytes'))
+    
     def scrape_all(self, sources):
         """Scrape all news sources"""
         print("\n" + "=" * 70)
@@ -379,18 +477,27 @@ class NewsScraper:
         
         total_items = 0
         
+        # Fetch every enabled source concurrently, then parse in order
+        fetched = self.engine.fetch_all(
+            (self.fetch_url(source), self.fetcher(source))
+            for source in sources if source.get('enabled', True)
+        )
+        
         for source in sources:
             if not source.get('enabled', True):
                 print(f"\n⏭️  Skipping (disabled): {source['name']}")
                 continue
             
-            # Check source type
-            if source.get('type') == 'newsapi':
-                items = self.scrape_newsapi(source)
-            elif 'rss' in source:
-                items = self.scrape_rss(source)
-            else:
-                items = self.scrape_html(source)
+            body = fetched.get(self.fetch_url(source), NOT_FETCHED)
+            
+            # Check source type (one transaction per source run)
+            with self.db.transaction():
+                if source.get('type') == 'newsapi':
+                    items = self.scrape_newsapi(source, body)
+                elif 'rss' in source:
+                    items = self.scrape_rss(source, body)
+                else:
+                    items = self.scrape_html(source, body)
             
             total_items += items
         
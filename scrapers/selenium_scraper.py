@@ -14,6 +14,7 @@ from webdriver_manager.chrome import ChromeDriverManager
 import time
 import re
 from datetime import datetime
+from utils.keyword_matcher import KEYWORDS
 
 
 class SeleniumScraper:
@@ -147,7 +148,10 @@ class SeleniumScraper:
                                         signal_type='tender',
                                         source_name=source['name'] + ' (Selenium)',
                                         source_url=self.driver.current_url,
-                                        confidence=0.90
+                                        confidence=0.90,
+                                        # Portal URLs carry session state; key on the tender itself
+                                        dedupe_key=ref_no if ref_no != "N/A" else f"{org['name']} {tender_title}",
+                                        products=KEYWORDS.match(signal_text).products
                                     )
                                     
                                     tenders_found += 1
@@ -191,15 +195,7 @@ class SeleniumScraper:
     
     def is_relevant_tender(self, text):
         """Check if tender text is relevant to fuel/petroleum"""
-        text_lower = text.lower()
-        
-        keywords = [
-            'fuel', 'diesel', 'petrol', 'petroleum', 'oil', 'lubricant',
-            'hsd', 'furnace', 'bitumen', 'hexane', 'chemical',
-            'refinery', 'energy', 'power', 'generator'
-        ]
-        
-        return any(keyword in text_lower for keyword in keywords)
+        return KEYWORDS.match(text).any('fuel', 'operational', 'product', 'sector')
     
     def extract_tender_details(self, text):
         """Extract structured details from tender text"""
@@ -3,23 +3,44 @@ Tender Scraper for HP-Pulse
 Scrapes government tender portals
 """
 
-from bs4 import BeautifulSoup
 from datetime import datetime
 import re
-from config import TENDER_KEYWORDS
+from utils.fetch_engine import FetchEngine, NOT_FETCHED, handle_not_modified
+from utils.html_parse import element_text, parse_html, strainer
+from utils.keyword_matcher import KEYWORDS
+
+# Public tender search page of the CPP Portal
+CPP_SEARCH_URL = "https://eprocure.gov.in/eprocure/app"
+
+# Listing selectors; pages are parsed into just these subtrees
+CPP_TENDER_CLASS = re.compile(r'tender|bid|rfp', re.I)
+CPP_TENDER_HREF = re.compile(r'tender|bid|procurement', re.I)
+CPP_STRAINER = strainer((('div', 'tr'), 'class', CPP_TENDER_CLASS),
+                        (('a',), 'href', CPP_TENDER_HREF))
+
+GEM_ORDER_CLASS = re.compile(r'order|procurement|bid|contract', re.I)
+GEM_ORDER_HREF = re.compile(r'product|bid|order', re.I)
+GEM_STRAINER = strainer((('div', 'tr', 'li'), 'class', GEM_ORDER_CLASS),
+                        (('a',), 'href', GEM_ORDER_HREF))
 
 class TenderScraper:
     def __init__(self, db, compliance_checker):
         self.db = db
         self.checker = compliance_checker
+        self.engine = FetchEngine(compliance_checker)
         print("✅ Tender scraper initialized")
     
     def is_relevant(self, text):
         """Check if tender is relevant"""
-        text_lower = text.lower()
-        return any(kw.lower() in text_lower for kw in TENDER_KEYWORDS)
+        return KEYWORDS.match(text).any('tender', 'product')
     
-    def scrape_cpp_portal(self, source):
+    def page_url(self, source):
+        """URL fetched for a tender source"""
+        if 'CPP' in source['name']:
+            return CPP_SEARCH_URL
+        return source['url']
+    
+    def scrape_cpp_portal(self, source, response=NOT_FETCHED):
         """
         Scrape CPP Portal
         Attempts to scrape public tender listings
@@ -31,9 +52,8 @@ class TenderScraper:
         
         try:
             # Try to access public tender search page
-            search_url = "https://eprocure.gov.in/eprocure/app"
-            
-            response = self.checker.make_request(search_url)
+            if response is NOT_FETCHED:
+                response = self.checker.make_request(CPP_SEARCH_URL, max_bytes=source.get('max_bytes'))
             if not response:
                 self.db.log_scrape(
                     source_name=source['name'],
@@ -45,23 +65,27 @@ class TenderScraper:
                 print("   ⚠️  Could not access CPP Portal (may require authentication)")
                 return 0
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            if response.not_modified:
+                return handle_not_modified(self.db, source, 'tender')
+            
+            soup = parse_html(response.content, CPP_STRAINER)
             
             # Look for tender listings (common HTML patterns)
-            tenders = soup.find_all(['div', 'tr'], class_=re.compile(r'tender|bid|rfp', re.I))
+            tenders = soup.find_all(['div', 'tr'], class_=CPP_TENDER_CLASS)
             
             if not tenders:
                 # Try alternative selectors
-                tenders = soup.find_all('a', href=re.compile(r'tender|bid|procurement', re.I))
+                tenders = soup.find_all('a', href=CPP_TENDER_HREF)
             
             print(f"   Found {len(tenders)} potential tender elements")
             
             for tender_elem in tenders[:20]:  # Limit to 20
                 # Extract text
-                text = tender_elem.get_text(strip=True)
+                text = element_text(tender_elem)
                 
                 # Check if relevant
-                if self.is_relevant(text) and len(text) > 20:
+                hits = KEYWORDS.match(text)
+                if hits.any('tender', 'product') and len(text) > 20:
                     # Try to extract company/org name
                     company_match = re.search(r'([A-Z][a-zA-Z\s&]+(?:Ltd|Limited|Corporation|Ministry|Department))', text)
                     company_name = company_match.group(1) if company_match else "Government Organization"
@@ -79,7 +103,8 @@ class TenderScraper:
                         signal_type='tender',
                         source_name=source['name'],
                         source_url=source['url'],
-                        confidence=0.85
+                        confidence=0.85,
+                        products=hits.products
                     )
                     
                     items_found += 1
@@ -91,6 +116,7 @@ class TenderScraper:
                 status='success',
                 items_found=items_found
             )
+            self.db.after_commit(self.checker.commit_cache, CPP_SEARCH_URL)
             
         except Exception as e:
             print(f"   ❌ Error: {e}")
@@ -105,7 +131,7 @@ class TenderScraper:
         print(f"   📊 Total tenders found: {items_found}")
         return items_found
     
-    def scrape_gem_portal(self, source):
+    def scrape_gem_portal(self, source, response=NOT_FETCHED):
         """
         Scrape GEM Portal
         Attempts to scrape public procurement listings
@@ -117,7 +143,8 @@ class TenderScraper:
         
         try:
             # Try to access GEM public pages
-            response = self.checker.make_request(source['url'])
+            if response is NOT_FETCHED:
+                response = self.checker.make_request(source['url'], max_bytes=source.get('max_bytes'))
             if not response:
                 self.db.log_scrape(
                     source_name=source['name'],
@@ -129,20 +156,24 @@ class TenderScraper:
                 print("   ⚠️  Could not access GEM Portal (may require authentication)")
                 return 0
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            if response.not_modified:
+                return handle_not_modified(self.db, source, 'tender')
+            
+            soup = parse_html(response.content, GEM_STRAINER)
             
             # Look for procurement/order listings
-            orders = soup.find_all(['div', 'tr', 'li'], class_=re.compile(r'order|procurement|bid|contract', re.I))
+            orders = soup.find_all(['div', 'tr', 'li'], class_=GEM_ORDER_CLASS)
             
             if not orders:
-                orders = soup.find_all('a', href=re.compile(r'product|bid|order', re.I))
+                orders = soup.find_all('a', href=GEM_ORDER_HREF)
             
             print(f"   Found {len(orders)} potential order elements")
             
             for order_elem in orders[:20]:  # Limit to 20
-                text = order_elem.get_text(strip=True)
+                text = element_text(order_elem)
                 
-                if self.is_relevant(text) and len(text) > 20:
+                hits = KEYWORDS.match(text)
+                if hits.any('tender', 'product') and len(text) > 20:
                     # Extract buyer organization
                     buyer_match = re.search(r'([A-Z][a-zA-Z\s&]+(?:Ltd|Limited|Corporation|Ministry|Organisation))', text)
                     buyer_name = buyer_match.group(1) if buyer_match else "Government Buyer"
@@ -158,7 +189,8 @@ class TenderScraper:
                         signal_type='tender',
                         source_name=source['name'],
                         source_url=source['url'],
-                        confidence=0.80
+                        confidence=0.80,
+                        products=hits.products
                     )
                     
                     items_found += 1
@@ -170,6 +202,7 @@ class TenderScraper:
                 status='success',
                 items_found=items_found
             )
+            self.db.after_commit(self.checker.commit_cache, source['url'])
             
         except Exception as e:
             print(f"   ❌ Error: {e}")
@@ -192,19 +225,32 @@ class TenderScraper:
         
         total_items = 0
         
+        # Fetch every enabled source's page concurrently, then parse in order
+        enabled = [s for s in sources if s.get('enabled', True)]
+        pages = self.engine.fetch_sources(
+            (s for s in enabled if 'CPP' in s['name'] or 'GEM' in s['name']),
+            url_of=self.page_url
+        )
+        
         for source in sources:
             if not source.get('enabled', True):
                 print(f"\n⏭️  Skipping (disabled): {source['name']}")
                 continue
             
-            # Route to appropriate scraper
-            if 'CPP' in source['name']:
-                items = self.scrape_cpp_portal(source)
-            elif 'GEM' in source['name']:
-                items = self.scrape_gem_portal(source)
-            else:
-                print(f"\n⚠️  No scraper implemented for: {source['name']}")
-                items = 0
+            response = pages.get(self.page_url(source))
+            if isinstance(response, Exception):
+                print(f"\n❌ Fetch failed for {source['name']}: {response}")
+                response = None
+            
+            # Route to appropriate scraper (one transaction per source run)
+            with self.db.transaction():
+                if 'CPP' in source['name']:
+                    items = self.scrape_cpp_portal(source, response)
+                elif 'GEM' in source['name']:
+                    items = self.scrape_gem_portal(source, response)
+                else:
+                    print(f"\n⚠️  No scraper implemented for: {source['name']}")
+                    items = 0
             
             total_items += items
         
@@ -4,5 +4,6 @@ HP-Pulse Scraper Utilities
 
 from .database import Database
 from .compliance import ComplianceChecker
+from .write_behind import WriteBehindWriter
 
-__all__ = ['Database', 'ComplianceChecker']
+__all__ = ['Database', 'ComplianceChecker', 'WriteBehindWriter']
@@ -0,0 +1,62 @@
+"""
+Per-domain circuit breaker
+Stops requests to a host after repeated failures and probes it again later
+"""
+
+import threading
+import time
+
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT
+
+CLOSED = 'closed'        # requests flow normally
+OPEN = 'open'            # host is failing; requests are skipped
+HALF_OPEN = 'half_open'  # one probe request is allowed through
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker for one domain.
+
+    After `failure_threshold` consecutive failures the circuit opens. Once
+    `reset_timeout` seconds have passed a single probe is let through: a
+    success closes the circuit, a failure re-opens it for another period.
+    record_success / record_failure return the new state when it changed,
+    otherwise None.
+    """
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """True if a request may be sent now (may move OPEN -> HALF_OPEN)"""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                return True
+            return False  # open, or a probe is already in flight
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self.state = CLOSED
+                return CLOSED
+            return None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                changed = self.state != OPEN
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                return OPEN if changed else None
+            return None
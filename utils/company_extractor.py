@@ -4,6 +4,9 @@ Extracts company names from news articles and tender documents
 """
 
 import re
+from functools import lru_cache
+
+from utils.gazetteer import Gazetteer
 
 
 class CompanyExtractor:
@@ -32,31 +35,108 @@ class CompanyExtractor:
         'Gillette', 'Quant', 'ICRA'
     ]
     
+    # Results for recently seen texts (articles are re-read across runs)
+    CACHE_SIZE = 4096
+    
+    # Placeholder names the scrapers store when no company was found
+    PLACEHOLDER_NAMES = {'unknown company', 'government organization', 'government buyer'}
+    
+    # Every known company: the lists above plus, once a Database is opened,
+    # the stored companies whose names end in a company suffix (see
+    # learn_companies); bare guesses like 'Prime Minister' are never learnt
+    KNOWN_COMPANIES = Gazetteer(PSU_KEYWORDS + MAJOR_COMPANIES)
+    PSU_NAMES = set(PSU_KEYWORDS)
+    NAME_ORDER = {name: i for i, name in enumerate(PSU_KEYWORDS + MAJOR_COMPANIES)}
+    
+    # Name ending in a company suffix ('Acme Chemicals Pvt. Ltd.')
+    SUFFIXED_NAME = re.compile(r'\b(?:' + '|'.join(COMPANY_SUFFIXES) + r')\W*$', re.IGNORECASE)
+    
+    # A suffix right after a major company's name ('Reliance Industries')
+    SUFFIX_AFTER = re.compile(r'\s+(?:' + '|'.join(sorted(COMPANY_SUFFIXES, key=len, reverse=True)) + r')\b',
+                              re.IGNORECASE)
+    
+    # "Company Name Ltd/Limited/etc" (case-sensitive)
+    SUFFIX_PATTERN = re.compile(r'\b([A-Z][A-Za-z&\s]+(?:' + '|'.join(COMPANY_SUFFIXES) + r'))\b')
+    
+    # Fallbacks for extract_primary_company: "Company announces", "by X Ltd", ...
+    PRIMARY_PATTERNS = [
+        re.compile(r'([A-Z][A-Za-z\s&]+?)\s+(?:announces|reported|launched|signed|awarded)'),
+        re.compile(r'(?:by|from)\s+([A-Z][A-Za-z\s&]+?)\s+(?:Ltd|Limited|Corporation)'),
+    ]
+    
+    # Industry keywords, first industry with any keyword in the text wins
+    INDUSTRIES = {
+        'Oil & Gas': ['oil', 'gas', 'petroleum', 'refinery', 'fuel', 'diesel', 'petrol', 'lng', 'lpg'],
+        'Chemicals': ['chemical', 'pharma', 'pharmaceutical', 'drug'],
+        'Manufacturing': ['manufacturing', 'factory', 'plant', 'production'],
+        'Technology': ['software', 'tech', 'IT', 'digital', 'ai', 'automation'],
+        'FMCG': ['fmcg', 'consumer goods', 'packaged'],
+        'Finance': ['bank', 'finance', 'investment', 'fund', 'mutual fund'],
+        'Infrastructure': ['infrastructure', 'construction', 'highway', 'road'],
+        'Textiles': ['textile', 'fabric', 'garment', 'apparel'],
+        'Agriculture': ['agriculture', 'agri', 'farming', 'crop']
+    }
+    INDUSTRY_PATTERNS = {
+        industry: re.compile('|'.join(re.escape(kw) for kw in keywords))
+        for industry, keywords in INDUSTRIES.items()
+    }
+    
+    @classmethod
+    def learn_companies(cls, names):
+        """
+        Add stored company names to KNOWN_COMPANIES; returns the names that
+        were new. Only suffixed names are trusted enough to learn.
+        """
+        return [
+            name for name in names
+            if name and len(name.strip()) > 2 and name.lower().strip() not in cls.PLACEHOLDER_NAMES
+            and cls.SUFFIXED_NAME.search(name) and cls.KNOWN_COMPANIES.add(name)
+        ]
+    
+    @classmethod
+    def forget_companies(cls, names):
+        """Remove learnt names again (their insert was rolled back)"""
+        for name in names:
+            cls.KNOWN_COMPANIES.remove(name)
+    
+    @classmethod
+    def find_known_companies(cls, text):
+        """
+        Known companies mentioned in text: listed PSUs, then listed major
+        companies (in list order), then other stored companies in text order.
+        """
+        listed = {}
+        others = []
+        for name, start, end in cls.KNOWN_COMPANIES.find(text):
+            if name not in cls.NAME_ORDER:
+                if name not in others:
+                    others.append(name)
+                continue
+            if name not in cls.PSU_NAMES and listed.get(name, name) == name:
+                # Full name with suffix, as written in the text
+                suffix = cls.SUFFIX_AFTER.match(text, end)
+                if suffix:
+                    listed[name] = text[start:suffix.end()]
+                    continue
+            listed.setdefault(name, name)
+        
+        return [listed[name] for name in sorted(listed, key=cls.NAME_ORDER.get)] + others
+    
     @classmethod
     def extract_companies(cls, text):
         """Extract company names from text"""
-        companies = []
-        
-        # Check for PSUs first
-        for psu in cls.PSU_KEYWORDS:
-            if psu.lower() in text.lower():
-                companies.append(psu)
-        
-        # Check for major companies
-        for company in cls.MAJOR_COMPANIES:
-            if company.lower() in text.lower():
-                # Try to get full name with suffix
-                pattern = rf'\b({re.escape(company)})\s+({"|".join(cls.COMPANY_SUFFIXES)})\b'
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    companies.append(match.group(0))
-                else:
-                    companies.append(company)
+        return list(cls._extract_companies(text, cls.KNOWN_COMPANIES.version))
+    
+    @classmethod
+    @lru_cache(maxsize=CACHE_SIZE)
+    def _extract_companies(cls, text, known_version):
+        """
+        extract_companies, cached per text (returns a tuple so it can't be
+        mutated); known_version drops stale results once companies are learnt
+        """
+        companies = cls.find_known_companies(text)
         
-        # Pattern for "Company Name Ltd/Limited/etc"
-        suffix_pattern = r'\b([A-Z][A-Za-z&\s]+(?:' + '|'.join(cls.COMPANY_SUFFIXES) + r'))\b'
-        matches = re.findall(suffix_pattern, text)
-        for match in matches:
+        for match in cls.SUFFIX_PATTERN.findall(text):
             # Filter out very short or very long names
             if 3 < len(match.split()) < 6 and len(match) < 50:
                 companies.append(match.strip())
@@ -70,8 +150,7 @@ class CompanyExtractor:
                 seen.add(company_lower)
                 unique_companies.append(company.strip())
         
-        # Return first company or empty list
-        return unique_companies[:3]  # Top 3 companies max
+        return tuple(unique_companies[:3])  # Top 3 companies max
     
     @classmethod
     def extract_primary_company(cls, text):
@@ -80,14 +159,8 @@ class CompanyExtractor:
         
         if not companies:
             # Try to extract from common patterns
-            # "Company announces", "Company reported", etc.
-            patterns = [
-                r'([A-Z][A-Za-z\s&]+?)\s+(?:announces|reported|launched|signed|awarded)',
-                r'(?:by|from)\s+([A-Z][A-Za-z\s&]+?)\s+(?:Ltd|Limited|Corporation)',
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, text)
+            for pattern in cls.PRIMARY_PATTERNS:
+                match = pattern.search(text)
                 if match:
                     return match.group(1).strip()
             
@@ -100,21 +173,8 @@ class CompanyExtractor:
         """Determine industry from text content"""
         text_lower = text.lower()
         
-        # Industry keywords
-        industries = {
-            'Oil & Gas': ['oil', 'gas', 'petroleum', 'refinery', 'fuel', 'diesel', 'petrol', 'lng', 'lpg'],
-            'Chemicals': ['chemical', 'pharma', 'pharmaceutical', 'drug'],
-            'Manufacturing': ['manufacturing', 'factory', 'plant', 'production'],
-            'Technology': ['software', 'tech', 'IT', 'digital', 'ai', 'automation'],
-            'FMCG': ['fmcg', 'consumer goods', 'packaged'],
-            'Finance': ['bank', 'finance', 'investment', 'fund', 'mutual fund'],
-            'Infrastructure': ['infrastructure', 'construction', 'highway', 'road'],
-            'Textiles': ['textile', 'fabric', 'garment', 'apparel'],
-            'Agriculture': ['agriculture', 'agri', 'farming', 'crop']
-        }
-        
-        for industry, keywords in industries.items():
-            if any(keyword in text_lower for keyword in keywords):
+        for industry, pattern in cls.INDUSTRY_PATTERNS.items():
+            if pattern.search(text_lower):
                 return industry
         
         return 'General Business'
@@ -0,0 +1,125 @@
+"""
+Company name canonicalisation and duplicate detection
+Maps spelling variants of one organisation to the same normalized_name
+"""
+
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+# Legal-form words dropped from the end of a name ('Indian Oil Corporation Ltd')
+LEGAL_SUFFIXES = {
+    'ltd', 'limited', 'pvt', 'private', 'corp', 'corporation', 'inc',
+    'incorporated', 'llc', 'llp', 'plc', 'co', 'company'
+}
+
+# Canonical alias -> canonical name, for acronyms and short forms in use
+COMPANY_ALIASES = {
+    'iocl': 'indian oil',
+    'ioc': 'indian oil',
+    'hpcl': 'hindustan petroleum',
+    'bpcl': 'bharat petroleum',
+    'ongc': 'oil and natural gas',
+    'gail': 'gail india',
+    'l and t': 'larsen and toubro',
+    'mrpl': 'mangalore refinery and petrochemicals',
+    'cpcl': 'chennai petroleum',
+    'nrl': 'numaligarh refinery',
+    'ril': 'reliance industries',
+}
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+_NUMBER = re.compile(r'\d+')
+
+
+def canonical_name(name):
+    """
+    Canonical form of a company name, used as companies.normalized_name.
+
+    Lower-cases, reads '&' as 'and', drops punctuation, a leading 'the' and
+    trailing legal-form words, then resolves known aliases:
+    'Indian Oil Corporation Ltd.', 'Indian Oil Corp' and 'IOCL' all give
+    'indian oil'.
+    """
+    text = (name or '').lower().replace('&', ' and ')
+    tokens = _NON_WORD.sub(' ', text).split()
+    if not tokens:
+        return (name or '').lower().strip()
+
+    if tokens[0] == 'the' and len(tokens) > 1:
+        tokens = tokens[1:]
+    stripped = list(tokens)
+    while len(stripped) > 1 and stripped[-1] in LEGAL_SUFFIXES:
+        stripped.pop()
+    canonical = ' '.join(stripped)
+    return COMPANY_ALIASES.get(canonical, canonical)
+
+
+def blocking_keys(canonical):
+    """
+    Keys a name is grouped under for fuzzy comparison: its first word and
+    its longest word. Only names sharing a key are ever compared.
+    """
+    tokens = canonical.split()
+    if not tokens:
+        return set()
+    return {tokens[0], max(tokens, key=len)}
+
+
+def similar_names(a, b, threshold):
+    """True if two canonical names are close enough to be the same company"""
+    # Numbers tell companies apart ('Unit 1' / 'Unit 2'); they must agree exactly
+    if _NUMBER.findall(a) != _NUMBER.findall(b):
+        return False
+    matcher = SequenceMatcher(None, a, b)
+    # Cheap upper bounds first; the full ratio is only computed for near misses
+    return (matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold
+            and matcher.ratio() >= threshold)
+
+
+def find_duplicates(companies, threshold=0.92, window=5, fuzzy=True):
+    """
+    Group companies that are the same organisation.
+
+    companies is an iterable of (id, canonical name). Names equal after
+    canonicalisation always group; others group when similar_names() says
+    so. Candidates come from blocking: within each blocking key the names
+    are sorted and each is compared with the next `window` names only, so
+    the work grows with (companies x window), not companies squared.
+    With fuzzy=False only exact canonical matches are grouped.
+
+    Returns {duplicate id: surviving id}, the survivor being the oldest
+    (lowest) id of its group.
+    """
+    parent = {}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a, b):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    by_name = {}
+    blocks = defaultdict(list)
+    for company_id, canonical in companies:
+        parent[company_id] = company_id
+        if canonical in by_name:
+            union(by_name[canonical], company_id)
+            continue
+        by_name[canonical] = company_id
+        for key in blocking_keys(canonical):
+            blocks[key].append(canonical)
+
+    for names in (blocks.values() if fuzzy else ()):
+        names.sort()
+        for i, name in enumerate(names):
+            for other in names[i + 1:i + 1 + window]:
+                if similar_names(name, other, threshold):
+                    union(by_name[name], by_name[other])
+
+    return {company_id: find(company_id) for company_id in parent if find(company_id) != company_id}
@@ -2,63 +2,317 @@
 Compliance checker for policy-safe web scraping
 """
 
+import random
 import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from urllib.parse import urlparse
 from urllib.robotparser import RobotFileParser
-from config import USER_AGENT, REQUEST_TIMEOUT
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from config import (USER_AGENT, REQUEST_TIMEOUT, HTTP_POOL_SIZE, HTTP_CACHE_DIR,
+                    FETCH_CONCURRENCY, ROBOTS_CACHE_TTL,
+                    MAX_RETRIES, RETRY_BACKOFF, RETRY_BACKOFF_MAX, MAX_RESPONSE_BYTES)
+from utils.circuit_breaker import CircuitBreaker, OPEN
+from utils.http_cache import HttpCache
+from utils.rate_limiter import RateLimiter
+
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+}
+
+# Retry an unreachable robots.txt after this many seconds (treated as allow-all meanwhile)
+ROBOTS_ERROR_TTL = 600
+
+# Responses worth retrying; other HTTP errors fail immediately
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Bodies we parse; anything else (PDF, images, archives) is aborted unread
+ACCEPTED_CONTENT_TYPES = ('html', 'xml', 'text/plain')
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class ResponseRejected(Exception):
+    """Body refused before or while downloading (too large / unwanted type)"""
+
 
 class ComplianceChecker:
-    def __init__(self):
-        self.last_request_times = {}  # domain -> timestamp
-        self.robots_cache = {}        # domain -> RobotFileParser
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, db=None, robots_ttl=ROBOTS_CACHE_TTL,
+                 archive=None):
+        self.limiter = RateLimiter()  # per-domain token buckets
+        self.robots_cache = {}        # domain -> (RobotFileParser, expires_at)
+        self._robots_locks = {}       # domain -> lock held while loading robots.txt
+        self.robots_ttl = robots_ttl
+        self.db = db                  # persists robots.txt across restarts when given
+        self.sessions = {}            # domain -> pooled requests.Session
+        self._sessions_lock = threading.Lock()
+        self.breakers = {}            # domain -> CircuitBreaker
+        self.transfer_metrics = {}    # domain -> bytes / fetch counters
+        
+        # ETag / Last-Modified revalidation; disabled when cache_dir is empty
+        self.http_cache = HttpCache(cache_dir) if cache_dir else None
+        self._uncached = {}           # url -> fetched response awaiting commit_cache()
+        self._uncached_lock = threading.Lock()
+        
+        # HttpArchive: record every response, or replay them with no network
+        self.archive = archive
         print("✅ Compliance checker initialized")
     
+    def get_session(self, domain):
+        """Get the pooled keep-alive session for a domain (scheme://host)"""
+        with self._sessions_lock:
+            session = self.sessions.get(domain)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self.sessions[domain] = session
+            return session
+    
+    def get_breaker(self, domain):
+        """Get the circuit breaker for a domain (scheme://host)"""
+        with self._sessions_lock:
+            breaker = self.breakers.get(domain)
+            if breaker is None:
+                breaker = self.breakers[domain] = CircuitBreaker()
+            return breaker
+    
+    def _record_outcome(self, domain, error=None):
+        """Feed a request outcome to the domain's breaker and log state changes"""
+        breaker = self.get_breaker(domain)
+        state = breaker.record_failure() if error else breaker.record_success()
+        if state is None:
+            return
+        
+        if state == OPEN:
+            print(f"⛔ Circuit opened for {domain} after {breaker.failures} failures: {error}")
+        else:
+            print(f"✅ Circuit closed for {domain}")
+        if self.db:
+            self.db.log_scrape(
+                source_name=domain,
+                source_type='circuit',
+                status=f"circuit_{state}",
+                items_found=0,
+                error=error
+            )
+    
+    @staticmethod
+    def _backoff(attempt, retry_after=None):
+        """Exponential backoff with full jitter; honours a numeric Retry-After"""
+        if retry_after is not None:
+            return min(retry_after, RETRY_BACKOFF_MAX)
+        return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** (attempt - 1)))
+    
+    @property
+    def replaying(self):
+        """True when responses come from an HttpArchive instead of the network"""
+        return bool(self.archive and self.archive.replaying)
+    
+    def close(self):
+        """Close all pooled sessions (and the HTTP archive, if any)"""
+        with self._sessions_lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+        if self.archive:
+            self.archive.close()
+    
+    def defer_cache(self, url, response):
+        """Hold a fetched response until commit_cache(url) puts it in the HTTP cache"""
+        if self.http_cache:
+            with self._uncached_lock:
+                self._uncached[url] = response
+    
+    def commit_cache(self, url):
+        """
+        Cache url's last fetched response (body + ETag / Last-Modified).
+        
+        Scrapers call this once the page's leads are committed. A page whose
+        parse or writes failed is never cached, so the next run fetches it
+        in full instead of getting a 304 and skipping it.
+        """
+        with self._uncached_lock:
+            response = self._uncached.pop(url, None)
+        if response is not None:
+            self.http_cache.store(url, response)
+    
     def check_robots_txt(self, url):
         """Check if URL is allowed by robots.txt"""
         parsed = urlparse(url)
         domain = f"{parsed.scheme}://{parsed.netloc}"
         
-        # Check cache
-        if domain in self.robots_cache:
-            rp = self.robots_cache[domain]
-            can_fetch = rp.can_fetch("*", url)
-            return can_fetch
+        return self.get_robots(domain).can_fetch("*", url)
+    
+    def get_robots(self, domain):
+        """
+        Parsed robots.txt for a domain (scheme://host).
+        
+        Served from memory, then from the database while younger than
+        robots_ttl, and only then fetched over the domain's pooled session.
+        """
+        cached = self.robots_cache.get(domain)
+        if cached and cached[1] > time.time():
+            return cached[0]
+        
+        # One loader per domain; concurrent callers wait and reuse its result
+        with self._sessions_lock:
+            lock = self._robots_locks.setdefault(domain, threading.Lock())
+        with lock:
+            cached = self.robots_cache.get(domain)
+            if cached and cached[1] > time.time():
+                return cached[0]
+            return self._load_or_fetch_robots(domain)
+    
+    def _load_or_fetch_robots(self, domain):
+        # Stored copy from a previous run
+        stored = self.db.get_robots(domain) if self.db else None
+        if stored:
+            status, text, last_checked = stored
+            age = (datetime.now() - datetime.fromisoformat(last_checked)).total_seconds()
+            if age < self.robots_ttl:
+                return self._load_robots(domain, status, text, self.robots_ttl - age)
         
-        # Fetch and parse robots.txt
+        # Fetch and parse robots.txt (bounded by REQUEST_TIMEOUT)
         try:
-            rp = RobotFileParser()
-            rp.set_url(f"{domain}/robots.txt")
-            rp.read()
-            self.robots_cache[domain] = rp
-            
-            can_fetch = rp.can_fetch("*", url)
-            
-            if not can_fetch:
-                print(f"⚠️  Blocked by robots.txt: {domain}")
-            else:
-                print(f"✓ robots.txt allows scraping: {domain}")
-            
-            return can_fetch
+            response = self.get_session(domain).get(f"{domain}/robots.txt", timeout=REQUEST_TIMEOUT)
+            status, text = response.status_code, response.text
         except Exception as e:
             print(f"⚠️  Could not fetch robots.txt for {domain}: {e}")
             # If can't fetch robots.txt, assume allowed but be cautious
-            return True
+            rp = RobotFileParser()
+            rp.allow_all = True
+            self.robots_cache[domain] = (rp, time.time() + ROBOTS_ERROR_TTL)
+            return rp
+        
+        rp = self._load_robots(domain, status, text, self.robots_ttl)
+        can_fetch = rp.can_fetch("*", f"{domain}/")
+        if self.db:
+            self.db.save_robots(domain, status, text, robots_compliant=can_fetch)
+        
+        if not can_fetch:
+            print(f"⚠️  Blocked by robots.txt: {domain}")
+        else:
+            print(f"✓ robots.txt allows scraping: {domain}")
+        return rp
+    
+    def _load_robots(self, domain, status, text, ttl):
+        """Build the parser from a robots.txt response and apply its rate limits"""
+        rp = RobotFileParser()
+        rp.set_url(f"{domain}/robots.txt")
+        if status in (401, 403):
+            rp.disallow_all = True
+        elif status >= 400:
+            rp.allow_all = True
+        else:
+            rp.parse((text or '').splitlines())
+        self.robots_cache[domain] = (rp, time.time() + ttl)
+        
+        # Honour Crawl-delay / Request-rate
+        rate = self.limiter.set_domain_rate(domain, rp.crawl_delay("*"), rp.request_rate("*"))
+        if rate < self.limiter.default_rate:
+            print(f"⏳ robots.txt limits {domain} to {rate:.2f} requests/s")
+        return rp
+    
+    def prefetch_robots(self, urls):
+        """Load robots.txt for every domain in urls concurrently (e.g. at startup)"""
+        if self.replaying:
+            return 0
+        domains = {f"{p.scheme}://{p.netloc}" for p in map(urlparse, urls) if p.netloc}
+        with ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY,
+                                thread_name_prefix='robots') as executor:
+            list(executor.map(self.get_robots, domains))
+        return len(domains)
+    
+    def rate_limit(self, domain):
+        """Wait for the domain's token bucket (thread-safe)"""
+        waited = self.limiter.acquire(domain)
+        if waited > 0:
+            print(f"⏳ Rate limited {domain}: waited {waited:.2f}s")
+    
+    def _record_transfer(self, domain, size, rejected=False):
+        with self._sessions_lock:
+            stats = self.transfer_metrics.setdefault(
+                domain, {'fetches': 0, 'bytes': 0, 'max_bytes': 0, 'rejected': 0})
+            stats['fetches'] += 1
+            stats['bytes'] += size
+            stats['max_bytes'] = max(stats['max_bytes'], size)
+            if rejected:
+                stats['rejected'] += 1
     
-    def rate_limit(self, domain, min_interval=1.0):
-        """Ensure minimum interval between requests to same domain"""
-        if domain in self.last_request_times:
-            elapsed = time.time() - self.last_request_times[domain]
-            if elapsed < min_interval:
-                sleep_time = min_interval - elapsed
-                print(f"⏳ Rate limiting {domain}: sleeping {sleep_time:.2f}s")
-                time.sleep(sleep_time)
+    def transfer_stats(self):
+        """Per-domain fetch counts and downloaded bytes"""
+        with self._sessions_lock:
+            return {domain: dict(stats) for domain, stats in self.transfer_metrics.items()}
+    
+    @staticmethod
+    def _read_body(response, max_bytes):
+        """
+        Stream the body into response._content, refusing it early if the
+        Content-Type is not one we parse or it grows beyond max_bytes.
+        """
+        content_type = response.headers.get('Content-Type', '').lower()
+        if content_type and not any(t in content_type for t in ACCEPTED_CONTENT_TYPES):
+            raise ResponseRejected(f"unsupported content type {content_type.split(';')[0]}")
+        
+        declared = response.headers.get('Content-Length')
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise ResponseRejected(f"Content-Length {int(declared):,} exceeds {max_bytes:,} bytes")
+        
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ResponseRejected(f"body exceeds {max_bytes:,} bytes")
+            chunks.append(chunk)
+        response._content = b''.join(chunks)
+        return size
+    
+    def rate_limit_stats(self):
+        """Per-domain request counts and rate-limit wait times"""
+        return self.limiter.stats()
+    
+    def make_request(self, url, headers=None, timeout=REQUEST_TIMEOUT, rate_limit=True,
+                     max_bytes=None):
+        """
+        Make a compliant HTTP request
+        
+        Sends If-None-Match / If-Modified-Since when a cached copy exists.
+        The returned response has `not_modified` set to True when the server
+        answered 304 and the body was served from the on-disk cache. A new
+        body only enters that cache through commit_cache(url).
+        Transient failures are retried with backoff; hosts that keep failing
+        are skipped while their circuit breaker is open (returns None).
+        Bodies are streamed and refused (None) past max_bytes (default
+        MAX_RESPONSE_BYTES) or when the Content-Type is not HTML/XML/text.
+        Pass rate_limit=False if the caller already waited on self.limiter.
+        
+        With a recording archive every returned response is saved; when
+        replaying, the archived response is returned and nothing is sent.
+        """
+        if self.replaying:
+            response = self.archive.load(url)
+            if response is None:
+                print(f"📼 Not in archive: {url}")
+            else:
+                print(f"📼 Replayed: {url} ({len(response.content)} bytes)")
+            return response
         
-        self.last_request_times[domain] = time.time()
+        response = self._fetch(url, headers, timeout, rate_limit, max_bytes)
+        if response is not None and self.archive:
+            self.archive.save(url, response)
+        return response
     
-    def make_request(self, url, headers=None, timeout=REQUEST_TIMEOUT):
-        """Make a compliant HTTP request"""
+    def _fetch(self, url, headers, timeout, rate_limit, max_bytes):
+        """Network side of make_request"""
         parsed = urlparse(url)
         domain = f"{parsed.scheme}://{parsed.netloc}"
         
@@ -67,37 +321,110 @@ class ComplianceChecker:
             print(f"❌ Skipping {url} - blocked by robots.txt")
             return None
         
+        # Skip hosts whose circuit is open (one probe is let through periodically)
+        if not self.get_breaker(domain).allow():
+            print(f"⛔ Skipping {url} - circuit open for {domain}")
+            return None
+        
         # Rate limit
-        self.rate_limit(domain)
+        if rate_limit:
+            self.rate_limit(domain)
         
-        # Make request
-        try:
-            default_headers = {
-                'User-Agent': USER_AGENT,
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
-            }
-            if headers:
-                default_headers.update(headers)
-            
-            print(f"🌐 Fetching: {url}")
-            response = requests.get(url, headers=default_headers, timeout=timeout)
-            response.raise_for_status()
-            
-            print(f"✓ Response: {response.status_code} ({len(response.content)} bytes)")
-            return response
+        # Conditional request headers from the cache
+        request_headers = dict(headers or {})
+        if self.http_cache:
+            for name, value in self.http_cache.validators(url).items():
+                request_headers.setdefault(name, value)
+        
+        # Make request (session supplies default headers and keep-alive);
+        # timeouts, connection errors, 429 and 5xx are retried with backoff
+        session = self.get_session(domain)
+        error = None
+        retry_after = None
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                # A retry is a request like any other: never sooner than the
+                # domain's crawl delay, and it takes a token from its bucket
+                delay = max(self._backoff(attempt, retry_after), self.limiter.interval(domain))
+                print(f"🔁 Retry {attempt}/{MAX_RETRIES} for {url} in {delay:.1f}s")
+                time.sleep(delay)
+                self.rate_limit(domain)
+                retry_after = None
             
-        except requests.exceptions.Timeout:
-            print(f"❌ Request timeout for {url}")
-            return None
-        except requests.exceptions.HTTPError as e:
-            print(f"❌ HTTP error for {url}: {e}")
-            return None
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Request failed for {url}: {e}")
+            try:
+                print(f"🌐 Fetching: {url}")
+                response = session.get(url, headers=request_headers, timeout=timeout, stream=True)
+                
+                if response.status_code == 304 and self.http_cache:
+                    response.close()
+                    cached = self._cached_response(url)
+                    if cached is not None:
+                        print(f"✓ Response: 304 Not Modified (served {len(cached.content)} bytes from cache)")
+                        self._record_transfer(domain, 0)
+                        self._record_outcome(domain)
+                        return cached
+                
+                if response.status_code in RETRY_STATUSES:
+                    response.close()
+                    error = f"HTTP {response.status_code}"
+                    retry_after = response.headers.get('Retry-After')
+                    retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+                    continue
+                
+                if response.status_code >= 400:
+                    response.close()
+                response.raise_for_status()
+                
+                try:
+                    size = self._read_body(response, max_bytes or MAX_RESPONSE_BYTES)
+                except ResponseRejected as e:
+                    response.close()
+                    print(f"❌ Refused {url}: {e}")
+                    self._record_transfer(domain, 0, rejected=True)
+                    self._record_outcome(domain)  # the host itself is fine
+                    return None
+                response.not_modified = False
+                self._record_transfer(domain, size)
+                
+                self.defer_cache(url, response)
+                
+                print(f"✓ Response: {response.status_code} ({size} bytes)")
+                self._record_outcome(domain)
+                return response
+                
+            except requests.exceptions.Timeout:
+                error = "timeout"
+                print(f"❌ Request timeout for {url}")
+            except requests.exceptions.ConnectionError as e:
+                error = str(e)
+                print(f"❌ Connection failed for {url}: {e}")
+            except requests.exceptions.HTTPError as e:
+                print(f"❌ HTTP error for {url}: {e}")
+                self._record_outcome(domain, str(e))
+                return None
+            except requests.exceptions.RequestException as e:
+                print(f"❌ Request failed for {url}: {e}")
+                self._record_outcome(domain, str(e))
+                return None
+        
+        print(f"❌ Giving up on {url} after {MAX_RETRIES + 1} attempts ({error})")
+        self._record_outcome(domain, error)
+        return None
+    
+    def _cached_response(self, url):
+        """Rebuild a response from the on-disk cache after a 304"""
+        entry = self.http_cache.get(url)
+        if not entry:
             return None
+        
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        response.encoding = entry.get('encoding')
+        response._content = self.http_cache.load_body(url)
+        response.not_modified = True
+        return response
     
     def log_provenance(self, url, data_extracted):
         """Log data provenance (source + timestamp)"""
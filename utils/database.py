@@ -3,23 +3,146 @@ Database operations for HP-Pulse Scraper
 """
 
 import sqlite3
-from datetime import datetime
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+import hashlib
 import json
+import re
+
+from utils.company_extractor import CompanyExtractor
+from utils.company_names import canonical_name, find_duplicates
+
+# Per-connection tuning; journal_mode=WAL is persistent and set in init_db
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous = NORMAL',   # safe with WAL, avoids fsync per commit
+    'PRAGMA busy_timeout = 5000',    # wait for locks instead of failing
+    'PRAGMA cache_size = -20000',    # ~20 MB page cache
+    'PRAGMA temp_store = MEMORY',
+)
+
+
+def day_bounds(day=None):
+    """
+    [start, end) ISO timestamp strings covering one calendar day.
+    
+    Range predicates on scraped_at can use its index, unlike DATE(scraped_at) = ?.
+    """
+    day = day or datetime.now().date()
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    return day.isoformat(), (day + timedelta(days=1)).isoformat()
+
+
+def connect_readonly(db_path='hp_pulse.db'):
+    """
+    Open a read-only connection for dashboards and exports.
+    
+    With the database in WAL mode, readers never block the scraper's writes
+    and vice versa. Raises sqlite3.OperationalError if the file is missing.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    conn.execute('PRAGMA query_only = ON')
+    return conn
 
 class Database:
-    def __init__(self, db_path='hp_pulse.db'):
+    def __init__(self, db_path='hp_pulse.db', company_cache_size=5000):
         self.db_path = db_path
+        self._local = threading.local()  # per-thread connection + transaction depth
+        
+        # LRU map: normalized company name -> company id
+        self.company_cache_size = company_cache_size
+        self._company_cache = OrderedDict()
+        self._company_cache_lock = threading.Lock()
+        
         self.init_db()
+        self.warm_company_cache()
+        self.load_known_companies()
     
     def get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_path)
+        """Get this thread's long-lived database connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+    
+    def close(self):
+        """Close this thread's connection (commits any pending writes)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.commit()
+            conn.close()
+            self._local.conn = None
+            self._local.depth = 0
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Unit of work: group writes into a single transaction.
+        
+        Writes made inside the block are committed once when the outermost
+        block exits, or rolled back if it raises. Blocks may be nested.
+        """
+        conn = self.get_connection()
+        if self._local.depth == 0:
+            self._local.learned = []    # company names learnt inside this transaction
+            self._local.on_commit = []  # after_commit callbacks
+        self._local.depth += 1
+        try:
+            yield conn
+        except Exception:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.rollback()
+                # Ids cached and names learnt during the rolled-back work may no longer exist
+                self.clear_company_cache()
+                CompanyExtractor.forget_companies(self._local.learned)
+                self._local.learned = []
+                self._local.on_commit = []
+            raise
+        else:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.commit()
+                self._local.learned = []
+                callbacks, self._local.on_commit = self._local.on_commit, []
+                for callback, args in callbacks:
+                    callback(*args)
+    
+    def after_commit(self, callback, *args):
+        """
+        Call callback(*args) once the current transaction has committed
+        (straight away outside one); dropped if it rolls back.
+        """
+        self.get_connection()
+        if self._local.depth:
+            self._local.on_commit.append((callback, args))
+        else:
+            callback(*args)
+    
+    def _commit(self, conn):
+        """Commit unless we are inside a transaction() block"""
+        if self._local.depth == 0:
+            conn.commit()
     
     def init_db(self):
         """Initialize database schema"""
         conn = self.get_connection()
         c = conn.cursor()
         
+        # Only takes effect on a new, empty database; see apply_retention
+        c.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        
+        # WAL lets monitor.py read while the scraper writes
+        c.execute('PRAGMA journal_mode = WAL')
+        
         # Companies table
         c.execute('''CREATE TABLE IF NOT EXISTS companies
                      (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -30,6 +153,14 @@ class Database:
                       website TEXT,
                       created_at TEXT)''')
         
+        # Canonical names of companies merged away, so later sightings of a
+        # merged spelling resolve to the surviving row instead of a new one
+        c.execute('''CREATE TABLE IF NOT EXISTS company_aliases
+                     (normalized_name TEXT PRIMARY KEY,
+                      company_id INTEGER NOT NULL,
+                      name TEXT,
+                      merged_at TEXT)''')
+        
         # Leads table
         c.execute('''CREATE TABLE IF NOT EXISTS leads
                      (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -42,6 +173,8 @@ class Database:
                       confidence REAL,
                       scraped_at TEXT,
                       processed BOOLEAN DEFAULT 0,
+                      fingerprint TEXT,
+                      last_seen_at TEXT,
                       FOREIGN KEY (company_id) REFERENCES companies (id))''')
         
         # Scrape log table
@@ -54,6 +187,16 @@ class Database:
                       error_message TEXT,
                       scraped_at TEXT)''')
         
+        # Per-day summaries of compacted scrape_log rows
+        c.execute('''CREATE TABLE IF NOT EXISTS scrape_log_daily
+                     (day TEXT NOT NULL,
+                      source_name TEXT NOT NULL,
+                      source_type TEXT NOT NULL,
+                      runs INTEGER NOT NULL DEFAULT 0,
+                      successes INTEGER NOT NULL DEFAULT 0,
+                      items_found INTEGER NOT NULL DEFAULT 0,
+                      PRIMARY KEY (day, source_name, source_type))''')
+        
         # Source registry
         c.execute('''CREATE TABLE IF NOT EXISTS source_registry
                      (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -63,25 +206,254 @@ class Database:
                       robots_compliant BOOLEAN,
                       last_checked TEXT)''')
         
+        # Migrate databases created before lead deduplication
+        self._ensure_column(c, 'leads', 'fingerprint', 'TEXT')
+        self._ensure_column(c, 'leads', 'last_seen_at', 'TEXT')
+        self._backfill_fingerprints(c)
+        
+        # Persisted robots.txt per domain (see get_robots / save_robots)
+        self._ensure_column(c, 'source_registry', 'robots_status', 'INTEGER')
+        self._ensure_column(c, 'source_registry', 'robots_txt', 'TEXT')
+        
         # Create indexes
         c.execute('CREATE INDEX IF NOT EXISTS idx_leads_scraped_at ON leads(scraped_at)')
+        c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_leads_fingerprint ON leads(fingerprint)')
         c.execute('CREATE INDEX IF NOT EXISTS idx_leads_company_id ON leads(company_id)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_leads_source_name ON leads(source_name)')
         c.execute('CREATE INDEX IF NOT EXISTS idx_companies_normalized ON companies(normalized_name)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_scrape_log_scraped_at ON scrape_log(scraped_at)')
+        
+        self._init_daily_stats(c)
+        self._init_search_index(c)
         
         conn.commit()
-        conn.close()
+        
+        # Rows stored before canonical names kept a plain lower(); recompute
+        # them so lookups match (merging is left to run_maintenance)
+        self.renormalize_companies()
+        
         print("✅ Database initialized")
     
+    @staticmethod
+    def _init_daily_stats(cursor):
+        """
+        Create the daily_lead_stats rollup and the triggers that maintain it.
+        
+        One row per (day, signal_type, source_name), so dashboard counts are
+        lookups over a small table instead of scans over leads.
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_lead_stats'"
+        ).fetchone()
+        
+        cursor.execute('''CREATE TABLE IF NOT EXISTS daily_lead_stats
+                          (day TEXT NOT NULL,
+                           signal_type TEXT NOT NULL,
+                           source_name TEXT NOT NULL,
+                           lead_count INTEGER NOT NULL DEFAULT 0,
+                           PRIMARY KEY (day, signal_type, source_name))''')
+        
+        if not exists:
+            # Backfill from leads already in the database
+            cursor.execute('''INSERT INTO daily_lead_stats
+                                  (day, signal_type, source_name, lead_count)
+                              SELECT substr(scraped_at, 1, 10), IFNULL(signal_type, ''),
+                                     IFNULL(source_name, ''), COUNT(*)
+                              FROM leads
+                              WHERE scraped_at IS NOT NULL
+                              GROUP BY 1, 2, 3''')
+        
+        cursor.execute('''CREATE TRIGGER IF NOT EXISTS trg_leads_stats_insert
+                          AFTER INSERT ON leads WHEN NEW.scraped_at IS NOT NULL
+                          BEGIN
+                              INSERT INTO daily_lead_stats (day, signal_type, source_name, lead_count)
+                              VALUES (substr(NEW.scraped_at, 1, 10), IFNULL(NEW.signal_type, ''),
+                                      IFNULL(NEW.source_name, ''), 1)
+                              ON CONFLICT (day, signal_type, source_name)
+                              DO UPDATE SET lead_count = lead_count + 1;
+                          END''')
+        
+        cursor.execute('''CREATE TRIGGER IF NOT EXISTS trg_leads_stats_delete
+                          AFTER DELETE ON leads WHEN OLD.scraped_at IS NOT NULL
+                          BEGIN
+                              UPDATE daily_lead_stats SET lead_count = lead_count - 1
+                              WHERE day = substr(OLD.scraped_at, 1, 10)
+                                AND signal_type = IFNULL(OLD.signal_type, '')
+                                AND source_name = IFNULL(OLD.source_name, '');
+                          END''')
+    
+    @staticmethod
+    def _init_search_index(cursor):
+        """
+        Create the leads_fts full-text index over leads.signal_text.
+        
+        External-content FTS5 table kept in sync by triggers; skipped with a
+        warning if this SQLite build lacks FTS5.
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'leads_fts'"
+        ).fetchone()
+        
+        try:
+            cursor.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS leads_fts
+                              USING fts5(signal_text, content='leads', content_rowid='id',
+                                         tokenize='porter unicode61')''')
+        except sqlite3.OperationalError as e:
+            print(f"⚠️  Full-text search unavailable: {e}")
+            return
+        
+        if not exists:
+            # Index leads already in the database
+            cursor.execute("INSERT INTO leads_fts(leads_fts) VALUES ('rebuild')")
+        
+        cursor.execute('''CREATE TRIGGER IF NOT EXISTS trg_leads_fts_insert
+                          AFTER INSERT ON leads
+                          BEGIN
+                              INSERT INTO leads_fts(rowid, signal_text)
+                              VALUES (NEW.id, NEW.signal_text);
+                          END''')
+        
+        cursor.execute('''CREATE TRIGGER IF NOT EXISTS trg_leads_fts_delete
+                          AFTER DELETE ON leads
+                          BEGIN
+                              INSERT INTO leads_fts(leads_fts, rowid, signal_text)
+                              VALUES ('delete', OLD.id, OLD.signal_text);
+                          END''')
+        
+        cursor.execute('''CREATE TRIGGER IF NOT EXISTS trg_leads_fts_update
+                          AFTER UPDATE OF signal_text ON leads
+                          BEGIN
+                              INSERT INTO leads_fts(leads_fts, rowid, signal_text)
+                              VALUES ('delete', OLD.id, OLD.signal_text);
+                              INSERT INTO leads_fts(rowid, signal_text)
+                              VALUES (NEW.id, NEW.signal_text);
+                          END''')
+    
+    @staticmethod
+    def _ensure_column(cursor, table, column, definition):
+        """Add a column to an existing table if it is missing"""
+        columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    
+    def _backfill_fingerprints(self, cursor):
+        """
+        Fingerprint leads stored before deduplication (fingerprint IS NULL).
+        
+        Rows that turn out to share a fingerprint, with each other or with
+        an already fingerprinted lead, are merged into the lowest id, which
+        keeps the latest last_seen_at; the rest are deleted. Must run
+        before the unique index on fingerprint is created.
+        """
+        rows = cursor.execute('''SELECT id, signal_type, source_url, signal_text,
+                                        IFNULL(last_seen_at, scraped_at)
+                                 FROM leads WHERE fingerprint IS NULL''').fetchall()
+        if not rows:
+            return
+        
+        groups = {}  # fingerprint -> [(id, last seen)]
+        for lead_id, signal_type, source_url, signal_text, seen in rows:
+            fingerprint = self.lead_fingerprint(signal_type, source_url, signal_text)
+            groups.setdefault(fingerprint, []).append((lead_id, seen))
+        
+        duplicates = []
+        keepers = []
+        for fingerprint, members in groups.items():
+            members += cursor.execute('''SELECT id, IFNULL(last_seen_at, scraped_at)
+                                         FROM leads WHERE fingerprint = ?''', (fingerprint,)).fetchall()
+            keep = min(lead_id for lead_id, _ in members)
+            last_seen = max((seen for _, seen in members if seen), default=None)
+            duplicates.extend((lead_id,) for lead_id, _ in members if lead_id != keep)
+            keepers.append((fingerprint, last_seen, keep))
+        
+        cursor.executemany("DELETE FROM leads WHERE id = ?", duplicates)
+        cursor.executemany("UPDATE leads SET fingerprint = ?, last_seen_at = ? WHERE id = ?", keepers)
+        print(f"🔑 Fingerprinted {len(rows)} existing leads ({len(duplicates)} duplicates merged)")
+    
+    @staticmethod
+    def lead_fingerprint(signal_type, source_url, signal_text, dedupe_key=None):
+        """
+        Stable identity of a lead across scrape runs.
+        
+        Uses the caller's dedupe_key (tender reference, directory company name)
+        when given, otherwise the source URL plus the normalized title
+        (first line of the signal text).
+        """
+        if dedupe_key:
+            key = re.sub(r'\W+', ' ', str(dedupe_key).lower()).strip()
+        else:
+            title = (signal_text or '').strip().split('\n', 1)[0]
+            title = re.sub(r'\W+', ' ', title.lower()).strip()
+            key = f"{source_url or ''}|{title}"
+        
+        return hashlib.sha1(f"{signal_type}|{key}".encode('utf-8')).hexdigest()
+    
+    def warm_company_cache(self):
+        """Preload the company id cache with the most recently created companies"""
+        if self.company_cache_size <= 0:
+            return
+        
+        conn = self.get_connection()
+        rows = conn.execute('''SELECT normalized_name, id FROM companies
+                               ORDER BY id DESC LIMIT ?''',
+                            (self.company_cache_size,)).fetchall()
+        
+        with self._company_cache_lock:
+            self._company_cache.clear()
+            # Oldest first, so the newest companies end up most-recently-used;
+            # unmerged duplicates resolve to the oldest row, as in insert_company
+            for normalized, company_id in reversed(rows):
+                self._company_cache.setdefault(normalized, company_id)
+    
+    def load_known_companies(self):
+        """Teach CompanyExtractor every stored company so extraction finds them directly"""
+        conn = self.get_connection()
+        names = (name for (name,) in conn.execute('SELECT name FROM companies ORDER BY id'))
+        return len(CompanyExtractor.learn_companies(names))
+    
+    def clear_company_cache(self):
+        """Drop all cached company ids"""
+        with self._company_cache_lock:
+            self._company_cache.clear()
+    
+    def _get_cached_company_id(self, normalized):
+        with self._company_cache_lock:
+            company_id = self._company_cache.get(normalized)
+            if company_id is not None:
+                self._company_cache.move_to_end(normalized)
+            return company_id
+    
+    def _cache_company_id(self, normalized, company_id):
+        if self.company_cache_size <= 0:
+            return
+        with self._company_cache_lock:
+            self._company_cache[normalized] = company_id
+            self._company_cache.move_to_end(normalized)
+            while len(self._company_cache) > self.company_cache_size:
+                self._company_cache.popitem(last=False)
+    
     def insert_company(self, name, industry=None, location=None, website=None):
-        """Insert or get company"""
+        """Insert or get company (spelling variants share its canonical name)"""
+        normalized = canonical_name(name)
+        
+        # Fast path: repeat organisations never touch SQLite
+        company_id = self._get_cached_company_id(normalized)
+        if company_id is not None:
+            return company_id
+        
         conn = self.get_connection()
         c = conn.cursor()
         
-        normalized = name.lower().strip()
-        
-        # Check if exists
-        c.execute("SELECT id FROM companies WHERE normalized_name = ?", (normalized,))
+        # Check if exists (by canonical name, then by the exact stored name,
+        # then as a spelling merged into another company)
+        c.execute("SELECT id FROM companies WHERE normalized_name = ? ORDER BY id LIMIT 1", (normalized,))
         existing = c.fetchone()
+        if not existing:
+            c.execute("SELECT id FROM companies WHERE name = ?", (name,))
+            existing = c.fetchone()
+        if not existing:
+            c.execute("SELECT company_id FROM company_aliases WHERE normalized_name = ?", (normalized,))
+            existing = c.fetchone()
         
         if existing:
             company_id = existing[0]
@@ -92,31 +464,75 @@ class Database:
                       (name, normalized, industry, location, website, 
                        datetime.now().isoformat()))
             company_id = c.lastrowid
+            learned = CompanyExtractor.learn_companies([name])
+            if self._local.depth:
+                # Unlearnt again if the surrounding transaction rolls back
+                self._local.learned.extend(learned)
         
-        conn.commit()
-        conn.close()
+        self._commit(conn)
+        self._cache_company_id(normalized, company_id)
         return company_id
     
     def insert_lead(self, company_id, signal_text, signal_type, source_name, 
-                    source_url, products=None, confidence=0.0):
-        """Insert a new lead"""
+                    source_url, products=None, confidence=0.0, dedupe_key=None):
+        """
+        Insert a new lead, or bump last_seen_at if it was already scraped.
+        
+        Returns the id of the new or existing lead.
+        """
         conn = self.get_connection()
         c = conn.cursor()
         
         products_json = json.dumps(products) if products else None
+        fingerprint = self.lead_fingerprint(signal_type, source_url, signal_text, dedupe_key)
+        now = datetime.now().isoformat()
         
-        c.execute('''INSERT INTO leads 
+        c.execute('''INSERT OR IGNORE INTO leads 
                      (company_id, signal_text, signal_type, source_name, 
-                      source_url, products_mentioned, confidence, scraped_at)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                      source_url, products_mentioned, confidence, scraped_at,
+                      fingerprint, last_seen_at)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
                   (company_id, signal_text, signal_type, source_name, 
-                   source_url, products_json, confidence, datetime.now().isoformat()))
+                   source_url, products_json, confidence, now,
+                   fingerprint, now))
         
-        lead_id = c.lastrowid
-        conn.commit()
-        conn.close()
+        if c.rowcount:
+            lead_id = c.lastrowid
+        else:
+            # Seen before: just record that it is still live
+            c.execute("UPDATE leads SET last_seen_at = ? WHERE fingerprint = ?",
+                      (now, fingerprint))
+            lead_id = c.execute("SELECT id FROM leads WHERE fingerprint = ?",
+                                (fingerprint,)).fetchone()[0]
+        
+        self._commit(conn)
         return lead_id
     
+    def touch_source_leads(self, source_name, window=timedelta(minutes=10)):
+        """
+        Mark a source's current leads as still live without re-parsing it.
+        
+        For a page that answered 304 Not Modified: the leads seen on its last
+        full parse (within `window` of the newest one) get last_seen_at = now,
+        so retention does not archive leads that are still listed. Returns
+        the number of leads touched.
+        """
+        conn = self.get_connection()
+        c = conn.cursor()
+        
+        latest = c.execute('''SELECT MAX(IFNULL(last_seen_at, scraped_at)) FROM leads
+                              WHERE source_name = ?''', (source_name,)).fetchone()[0]
+        if latest is None:
+            return 0
+        
+        cutoff = (datetime.fromisoformat(latest) - window).isoformat()
+        touched = c.execute('''UPDATE leads SET last_seen_at = ?
+                               WHERE source_name = ? AND IFNULL(last_seen_at, scraped_at) >= ?''',
+                            (datetime.now().isoformat(), source_name, cutoff)).rowcount
+        
+        self._commit(conn)
+        return touched
+    
     def log_scrape(self, source_name, source_type, status, items_found, error=None):
         """Log scraping attempt"""
         conn = self.get_connection()
@@ -129,8 +545,30 @@ class Database:
                   (source_name, source_type, status, items_found, 
                    error, datetime.now().isoformat()))
         
-        conn.commit()
-        conn.close()
+        self._commit(conn)
+    
+    def get_robots(self, domain):
+        """Stored robots.txt for a domain as (status, text, last_checked), or None"""
+        conn = self.get_connection()
+        row = conn.execute('''SELECT robots_status, robots_txt, last_checked
+                              FROM source_registry
+                              WHERE domain = ? AND robots_status IS NOT NULL''',
+                           (domain,)).fetchone()
+        return tuple(row) if row else None
+    
+    def save_robots(self, domain, status, text, robots_compliant=None):
+        """Store a fetched robots.txt (HTTP status + body) for a domain"""
+        conn = self.get_connection()
+        conn.execute('''INSERT INTO source_registry
+                        (domain, robots_compliant, robots_status, robots_txt, last_checked)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(domain) DO UPDATE SET
+                            robots_compliant = excluded.robots_compliant,
+                            robots_status = excluded.robots_status,
+                            robots_txt = excluded.robots_txt,
+                            last_checked = excluded.last_checked''',
+                     (domain, robots_compliant, status, text, datetime.now().isoformat()))
+        self._commit(conn)
     
     def get_recent_leads(self, limit=10):
         """Get recent leads"""
@@ -145,7 +583,6 @@ class Database:
                      LIMIT ?''', (limit,))
         
         results = c.fetchall()
-        conn.close()
         return results
     
     def get_stats(self):
@@ -155,24 +592,231 @@ class Database:
         
         stats = {}
         
-        # Total counts
+        # Total counts (lead counts come from the daily_lead_stats rollup)
         stats['total_companies'] = c.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
-        stats['total_leads'] = c.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+        stats['total_leads'] = c.execute(
+            "SELECT IFNULL(SUM(lead_count), 0) FROM daily_lead_stats"
+        ).fetchone()[0]
         
         # Today's leads
         today = datetime.now().date().isoformat()
         stats['today_leads'] = c.execute(
-            "SELECT COUNT(*) FROM leads WHERE DATE(scraped_at) = ?", 
+            "SELECT IFNULL(SUM(lead_count), 0) FROM daily_lead_stats WHERE day = ?", 
             (today,)
         ).fetchone()[0]
         
         # Leads by type
         stats['by_type'] = c.execute("""
-            SELECT signal_type, COUNT(*) as count
-            FROM leads
+            SELECT signal_type, SUM(lead_count) as count
+            FROM daily_lead_stats
             GROUP BY signal_type
+            HAVING count > 0
             ORDER BY count DESC
         """).fetchall()
         
-        conn.close()
         return stats
+    
+    def apply_retention(self, archive_path, retention_days, scrape_log_days=None,
+                        batch_size=5000):
+        """
+        Move old leads to the archive database and compact scrape_log.
+        
+        retention_days maps signal_type -> days; leads of that type not seen
+        for longer are copied (with their companies) into archive_path and
+        deleted here. Types missing from the map are kept forever. scrape_log
+        rows older than scrape_log_days are folded into scrape_log_daily.
+        Freed pages are then returned to the OS with incremental_vacuum.
+        
+        Returns a dict of counts.
+        """
+        conn = self.get_connection()
+        c = conn.cursor()
+        conn.commit()  # ATTACH cannot run inside a transaction
+        
+        result = {'archived': {}, 'scrape_log_compacted': 0}
+        
+        c.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+        try:
+            lead_columns = self._sync_archive_table(c, 'leads')
+            company_columns = self._sync_archive_table(c, 'companies')
+            lead_cols = ', '.join(lead_columns)
+            company_cols = ', '.join(company_columns)
+            conn.commit()
+            
+            for signal_type, days in retention_days.items():
+                cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+                archived = 0
+                
+                # Chunked so the scraper's writer is never locked out for long
+                while True:
+                    ids = [row[0] for row in c.execute(
+                        '''SELECT id FROM main.leads
+                           WHERE signal_type = ? AND IFNULL(last_seen_at, scraped_at) < ?
+                           LIMIT ?''', (signal_type, cutoff, batch_size))]
+                    if not ids:
+                        break
+                    
+                    placeholders = ','.join('?' * len(ids))
+                    c.execute(f'''INSERT OR IGNORE INTO archive.companies ({company_cols})
+                                   SELECT {company_cols} FROM main.companies
+                                   WHERE id IN (SELECT company_id FROM main.leads
+                                                WHERE id IN ({placeholders}))''', ids)
+                    c.execute(f'''INSERT OR IGNORE INTO archive.leads ({lead_cols})
+                                   SELECT {lead_cols} FROM main.leads
+                                   WHERE id IN ({placeholders})''', ids)
+                    c.execute(f"DELETE FROM main.leads WHERE id IN ({placeholders})", ids)
+                    conn.commit()
+                    archived += len(ids)
+                
+                if archived:
+                    print(f"🗄️  Archived {archived} {signal_type} leads older than {days} days")
+                result['archived'][signal_type] = archived
+        finally:
+            conn.commit()
+            c.execute("DETACH DATABASE archive")
+        
+        if scrape_log_days is not None:
+            result['scrape_log_compacted'] = self.compact_scrape_log(scrape_log_days)
+        
+        # Databases created before auto_vacuum was enabled need one full VACUUM
+        if c.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            print("🧹 Enabling incremental auto-vacuum (one-time full VACUUM)...")
+            c.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            c.execute("VACUUM")
+        
+        c.execute("PRAGMA incremental_vacuum").fetchall()
+        return result
+    
+    @staticmethod
+    def _sync_archive_table(cursor, table):
+        """Create/migrate archive.<table> to match main.<table>; returns column names"""
+        columns = [(row[1], row[2]) for row in cursor.execute(f"PRAGMA main.table_info({table})")]
+        names = [name for name, _ in columns]
+        
+        definitions = ', '.join(
+            f"{name} {col_type} PRIMARY KEY" if name == 'id' else f"{name} {col_type}"
+            for name, col_type in columns
+        )
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS archive.{table} ({definitions})")
+        
+        existing = {row[1] for row in cursor.execute(f"PRAGMA archive.table_info({table})")}
+        for name, col_type in columns:
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE archive.{table} ADD COLUMN {name} {col_type}")
+        
+        return names
+    
+    def renormalize_companies(self):
+        """
+        Recompute every normalized_name with canonical_name.
+        
+        Run on every start by init_db. Only rewrites names; companies that
+        now share a canonical name are left for merge_duplicate_companies.
+        Returns how many rows changed.
+        """
+        conn = self.get_connection()
+        
+        renamed = []
+        for company_id, name, normalized in conn.execute("SELECT id, name, normalized_name FROM companies"):
+            canonical = canonical_name(name)
+            if canonical != normalized:
+                renamed.append((canonical, company_id))
+        
+        if renamed:
+            with self.transaction():
+                conn.executemany("UPDATE companies SET normalized_name = ? WHERE id = ?", renamed)
+            print(f"🔤 Renormalized {len(renamed)} company names")
+        return len(renamed)
+    
+    def merge_duplicate_companies(self, threshold=0.92, window=5, fuzzy=True, dry_run=False):
+        """
+        Merge companies that are spelling variants of one organisation.
+        
+        Recomputes every normalized_name with canonical_name (rows stored
+        before canonicalisation only had lower()), then merges exact and
+        fuzzy duplicates (see company_names.find_duplicates) into the oldest
+        row: their leads are re-pointed in one UPDATE, the duplicates
+        deleted and their canonical names kept in company_aliases so
+        insert_company maps them to the survivor from then on, all in one
+        transaction. With fuzzy=False only names equal after
+        canonicalisation are merged.
+        
+        Every merge is printed; with dry_run=True nothing is written.
+        
+        Returns a dict of counts.
+        """
+        conn = self.get_connection()
+        c = conn.cursor()
+        
+        rows = [(company_id, name, canonical_name(name), normalized) for company_id, name, normalized
+                in c.execute("SELECT id, name, normalized_name FROM companies ORDER BY id")]
+        renamed = [(canonical, company_id) for company_id, _, canonical, normalized in rows
+                   if canonical != normalized]
+        merges = find_duplicates(((company_id, canonical) for company_id, _, canonical, _ in rows),
+                                 threshold=threshold, window=window, fuzzy=fuzzy)
+        
+        names = {company_id: (name, canonical) for company_id, name, canonical, _ in rows}
+        for old_id, new_id in sorted(merges.items()):
+            print(f"   🔗 {names[old_id][0]} → {names[new_id][0]}")
+        if dry_run:
+            print(f"🔎 Dry run: {len(merges)} duplicate companies would be merged, nothing changed")
+            return {'renormalized': len(renamed), 'merged': len(merges), 'leads_moved': 0}
+        
+        # Spellings that no longer match their survivor's canonical name
+        aliases = [(names[old_id][1], new_id, names[old_id][0], datetime.now().isoformat())
+                   for old_id, new_id in merges.items() if names[old_id][1] != names[new_id][1]]
+        
+        with self.transaction():
+            c.executemany("UPDATE companies SET normalized_name = ? WHERE id = ?", renamed)
+        
+            c.execute('''CREATE TEMP TABLE IF NOT EXISTS company_merges
+                         (old_id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL)''')
+            c.execute("DELETE FROM company_merges")
+            c.executemany("INSERT INTO company_merges (old_id, new_id) VALUES (?, ?)", merges.items())
+        
+            leads_moved = c.execute('''UPDATE leads
+                                       SET company_id = (SELECT new_id FROM company_merges
+                                                         WHERE old_id = leads.company_id)
+                                       WHERE company_id IN (SELECT old_id FROM company_merges)''').rowcount
+            c.execute('''UPDATE company_aliases
+                         SET company_id = (SELECT new_id FROM company_merges
+                                           WHERE old_id = company_aliases.company_id)
+                         WHERE company_id IN (SELECT old_id FROM company_merges)''')
+            c.executemany('''INSERT OR REPLACE INTO company_aliases
+                                 (normalized_name, company_id, name, merged_at)
+                             VALUES (?, ?, ?, ?)''', aliases)
+            c.execute("DELETE FROM companies WHERE id IN (SELECT old_id FROM company_merges)")
+            c.execute("DELETE FROM company_merges")
+        
+        # Cached ids may point at deleted rows, and their keys may have changed
+        self.warm_company_cache()
+        
+        if merges:
+            print(f"🔗 Merged {len(merges)} duplicate companies ({leads_moved} leads re-pointed)")
+        return {'renormalized': len(renamed), 'merged': len(merges), 'leads_moved': leads_moved}
+    
+    def compact_scrape_log(self, keep_days):
+        """Fold scrape_log rows older than keep_days into per-day summaries"""
+        conn = self.get_connection()
+        c = conn.cursor()
+        
+        cutoff, _ = day_bounds(datetime.now().date() - timedelta(days=keep_days))
+        
+        c.execute('''INSERT INTO scrape_log_daily
+                         (day, source_name, source_type, runs, successes, items_found)
+                     SELECT substr(scraped_at, 1, 10), IFNULL(source_name, ''),
+                            IFNULL(source_type, ''), COUNT(*),
+                            SUM(status = 'success'), SUM(IFNULL(items_found, 0))
+                     FROM scrape_log
+                     WHERE scraped_at < ?
+                     GROUP BY 1, 2, 3
+                     ON CONFLICT (day, source_name, source_type) DO UPDATE SET
+                         runs = runs + excluded.runs,
+                         successes = successes + excluded.successes,
+                         items_found = items_found + excluded.items_found''', (cutoff,))
+        compacted = c.execute("DELETE FROM scrape_log WHERE scraped_at < ?", (cutoff,)).rowcount
+        
+        self._commit(conn)
+        if compacted:
+            print(f"🧹 Compacted {compacted} scrape_log rows older than {keep_days} days")
+        return compacted
@@ -0,0 +1,102 @@
+"""
+Incremental RSS / Atom reader
+Parses a feed body chunk by chunk and stops as soon as enough entries are read
+"""
+
+import xml.etree.ElementTree as ET
+
+import feedparser
+
+# Entry elements by local name: RSS 0.9x/2.0 and RSS 1.0 (RDF) <item>, Atom <entry>
+ENTRY_TAGS = ('item', 'entry')
+
+# Child element (local name) -> entry field, first match wins
+ENTRY_FIELDS = {
+    'title': 'title',
+    'link': 'link',
+    'description': 'description',
+    'summary': 'summary',
+    'content': 'summary',
+    'pubDate': 'published',
+    'published': 'published',
+    'updated': 'published',
+    'guid': 'id',
+    'id': 'id',
+}
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _entry_from_element(element):
+    """Flatten an <item> / <entry> element into a feedparser-like dict"""
+    entry = {}
+    for child in element:
+        name = _local_name(child.tag)
+        field = ENTRY_FIELDS.get(name)
+        if not field or field in entry:
+            continue
+        if name == 'link' and child.get('href'):
+            # Atom: <link rel="alternate" href="..."/>
+            if child.get('rel', 'alternate') != 'alternate':
+                continue
+            entry['link'] = child.get('href')
+        else:
+            entry[field] = ''.join(child.itertext()).strip()
+    return entry
+
+
+def _iter_xml_entries(chunks, limit):
+    parser = ET.XMLPullParser(events=('end',))
+    count = 0
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            if _local_name(element.tag) in ENTRY_TAGS:
+                yield _entry_from_element(element)
+                count += 1
+                if count >= limit:
+                    return
+                element.clear()  # keep memory flat on long feeds
+    parser.close()
+
+
+def _chunked(content, chunk_size):
+    for start in range(0, len(content), chunk_size):
+        yield content[start:start + chunk_size]
+
+
+def read_feed_entries(content, limit=20, chunk_size=16384):
+    """
+    First `limit` entries of an RSS/Atom document as dicts
+    (title, link, description/summary, published, id).
+
+    content is the raw body (bytes) or an iterable of byte chunks, e.g.
+    response.iter_content(). Parsing stops once the limit is reached. Feeds
+    that are not well-formed XML, or in which no entries were recognised,
+    fall back to feedparser's lenient parser.
+    """
+    if isinstance(content, (bytes, bytearray)):
+        body = bytes(content)
+        chunks = _chunked(body, chunk_size)
+    else:
+        # Remember what was consumed in case we need to fall back
+        content = iter(content)
+        received = []
+        chunks = (received.append(chunk) or chunk for chunk in content)
+
+    entries = []
+    try:
+        for entry in _iter_xml_entries(chunks, limit):
+            entries.append(entry)
+        if entries:
+            return entries
+        reason = "has no entries we recognise"
+    except ET.ParseError:
+        reason = "is not well-formed XML"
+
+    if not isinstance(content, (bytes, bytearray)):
+        body = b''.join(received) + b''.join(content)
+    print(f"   ⚠️  Feed {reason}, falling back to feedparser")
+    return feedparser.parse(body).entries[:limit]
@@ -0,0 +1,123 @@
+"""
+Asyncio fetch engine for concurrent multi-source scraping
+Fetches every source of a cycle at once; requests to the same host stay sequential
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from config import FETCH_CONCURRENCY, HTTP2_ENABLED
+from utils.http2_client import Http2Client, HTTP2_AVAILABLE
+
+# Default for scraper methods' prefetched-response argument: "fetch it yourself"
+NOT_FETCHED = object()
+
+
+def handle_not_modified(db, source, source_type):
+    """
+    Record a source whose page came back 304 and return its item count (0).
+
+    Nothing new to parse, but its leads are still listed, so they are kept
+    out of retention and the run is logged as a success.
+    """
+    print("   ♻️  Unchanged since last run - skipping parse")
+    db.touch_source_leads(source['name'])
+    db.log_scrape(
+        source_name=source['name'],
+        source_type=source_type,
+        status='success',
+        items_found=0
+    )
+    return 0
+
+
+class FetchEngine:
+    """
+    Runs blocking fetch calls concurrently on an asyncio loop.
+
+    Each job is (url, fetch) where fetch() does the blocking I/O, usually
+    ComplianceChecker.make_request. Jobs for different hosts run in parallel
+    (up to max_concurrency); jobs for the same host are serialized and each
+    one first waits, without occupying a worker thread, on the checker's
+    per-domain token bucket, so fetch() must not rate limit again (pass
+    rate_limit=False to make_request). Duplicate URLs are fetched once.
+
+    With http2=True (and httpx installed), fetch_urls / fetch_sources use
+    Http2Client instead, so pages on the same host overlap as HTTP/2 streams.
+    """
+
+    def __init__(self, compliance_checker, max_concurrency=FETCH_CONCURRENCY, http2=HTTP2_ENABLED):
+        self.checker = compliance_checker
+        self.max_concurrency = max_concurrency
+        self.http2 = http2 and HTTP2_AVAILABLE
+        if http2 and not HTTP2_AVAILABLE:
+            print("⚠️  HTTP/2 requested but httpx[http2] is not installed - using HTTP/1.1")
+
+    def fetch_all(self, jobs):
+        """
+        Run jobs concurrently and return {url: result}.
+
+        A job that raises yields its exception instance as the result.
+        """
+        jobs = list(dict((url, fetch) for url, fetch in jobs).items())
+        if not jobs:
+            return {}
+        return asyncio.run(self._fetch_all(jobs))
+
+    def fetch_urls(self, urls):
+        """Fetch plain URLs through the compliance checker"""
+        if self.http2:
+            return Http2Client(self.checker).fetch_all(urls)
+
+        # The engine already waited on the rate limiter for each job
+        return self.fetch_all(
+            (url, lambda url=url: self.checker.make_request(url, rate_limit=False))
+            for url in urls
+        )
+
+    def fetch_sources(self, sources, url_of=lambda source: source['url']):
+        """Fetch each source's page (keyed by url_of(source)), honouring its max_bytes"""
+        if self.http2:
+            caps = {url_of(source): source.get('max_bytes') for source in sources}
+            return Http2Client(self.checker).fetch_all(caps, max_bytes=caps)
+
+        return self.fetch_all(
+            (url_of(source),
+             lambda source=source: self.checker.make_request(
+                 url_of(source), rate_limit=False, max_bytes=source.get('max_bytes')))
+            for source in sources
+        )
+
+    async def _fetch_all(self, jobs):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_concurrency)
+        domain_locks = {}
+        robots_loaded = set()
+
+        async def run(url, fetch):
+            parsed = urlparse(url)
+            domain = f"{parsed.scheme}://{parsed.netloc}"
+            lock = domain_locks.setdefault(domain, asyncio.Lock())
+            async with lock:
+                # Replayed responses never touch the network, so never wait for them
+                if not self.checker.replaying:
+                    if domain not in robots_loaded:
+                        # Load robots.txt first so its Crawl-delay already
+                        # paces this domain's first request
+                        await loop.run_in_executor(executor, self.checker.get_robots, domain)
+                        robots_loaded.add(domain)
+                    waited = await self.checker.limiter.acquire_async(domain)
+                    if waited > 0:
+                        print(f"⏳ Rate limited {domain}: waited {waited:.2f}s")
+                async with slots:
+                    try:
+                        return await loop.run_in_executor(executor, fetch)
+                    except Exception as e:
+                        return e
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                thread_name_prefix='fetch') as executor:
+            results = await asyncio.gather(*(run(url, fetch) for url, fetch in jobs))
+
+        return {url: result for (url, _), result in zip(jobs, results)}
@@ -0,0 +1,126 @@
+"""
+Gazetteer of known company names
+Token trie that finds every known company in a text in one pass
+"""
+
+import re
+import threading
+
+from utils.keyword_matcher import lower_aligned
+
+# Words, with '&' kept inside a word ('l&t') and read as 'and' on its own
+# ('larsen & toubro'); other punctuation only separates tokens, so
+# 'Pvt. Ltd.' == 'pvt ltd'
+TOKEN_PATTERN = re.compile(r'\w+(?:&\w+)*|&')
+
+END = None  # trie key marking the end of a name
+
+
+def tokenize(text):
+    """Lower-cased tokens of text as regex matches"""
+    return list(TOKEN_PATTERN.finditer(lower_aligned(text)))
+
+
+class Gazetteer:
+    """
+    Token trie of company names.
+
+    find() walks the text's tokens once, taking the longest known name at
+    each position ('Tech Mahindra', not 'Mahindra'). Short all-caps names
+    (ONGC, ITC) only match in capitals, so 'itc' in running text does not.
+    Names can be added at any time; version changes whenever one is, so
+    callers can key caches on it.
+    """
+
+    def __init__(self, names=()):
+        self.trie = {}
+        self.size = 0
+        self.version = 0
+        self._lock = threading.Lock()
+        self.add_all(names)
+
+    def add(self, name):
+        """Add a name; returns False if it (or a name spelt the same way) is known"""
+        tokens = [m.group() for m in tokenize(name)]
+        if not tokens:
+            return False
+        acronym = len(tokens) == 1 and name.strip().isupper() and len(tokens[0]) <= 5
+
+        with self._lock:
+            node = self.trie
+            for token in tokens:
+                if token in ('&', 'and'):
+                    # Both spellings lead to the same subtree
+                    child = node.get('and') or node.get('&') or {}
+                    node['and'] = node['&'] = child
+                    node = child
+                else:
+                    node = node.setdefault(token, {})
+            if END in node:
+                return False  # first spelling wins
+            node[END] = (name.strip(), acronym)
+            self.size += 1
+            self.version += 1
+        return True
+
+    def remove(self, name):
+        """Remove a name; returns False if it was not known"""
+        with self._lock:
+            node = self.trie
+            for match in tokenize(name):
+                node = node.get(match.group())
+                if node is None:
+                    return False
+            if node.get(END, ('',))[0] != name.strip():
+                return False
+            del node[END]
+            self.size -= 1
+            self.version += 1
+        return True
+
+    def add_all(self, names):
+        """Add many names; returns how many were new"""
+        return sum(1 for name in names if self.add(name))
+
+    def find(self, text):
+        """Known names in text as [(name, start, end)], in text order"""
+        if not text:
+            return []
+        tokens = tokenize(text)
+        words = [m.group() for m in tokens]
+        root = self.trie
+        found = []
+        i = 0
+        while i < len(words):
+            node = root.get(words[i])
+            match = None
+            j = i
+            while node is not None:
+                entry = node.get(END)
+                if entry is not None:
+                    name, acronym = entry
+                    start, end = tokens[i].start(), tokens[j].end()
+                    if not acronym or text[start:end].isupper():
+                        match = (name, start, end, j)
+                j += 1
+                if j == len(words):
+                    break
+                node = node.get(words[j])
+            if match:
+                name, start, end, j = match
+                found.append((name, start, end))
+                i = j + 1
+            else:
+                i += 1
+        return found
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, name):
+        node = self.trie
+        for match in tokenize(name):
+            node = node.get(match.group())
+            if node is None:
+                return False
+        return END in node
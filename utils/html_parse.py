@@ -0,0 +1,61 @@
+"""
+Shared HTML parsing for the scrapers
+lxml-backed BeautifulSoup that only builds the subtrees a scraper looks at
+"""
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+PARSER = 'lxml'
+
+
+def strainer(*rules):
+    """
+    SoupStrainer keeping elements that match any rule, with their subtrees.
+
+    A rule is (tag names, attribute, compiled pattern); with attribute None
+    every element of those names is kept. Elements inside a kept one are
+    always kept, so finds scoped to a listing still see its children.
+    """
+    def keep(name, attrs):
+        for names, attr, pattern in rules:
+            if name not in names:
+                continue
+            if attr is None:
+                return True
+            value = attrs.get(attr)
+            if isinstance(value, list):
+                value = ' '.join(value)
+            if value and pattern.search(value):
+                return True
+        return False
+
+    return SoupStrainer(keep)
+
+
+def parse_html(content, parse_only=None):
+    """Parse a page with lxml, building only what parse_only (a strainer) keeps"""
+    return BeautifulSoup(content, PARSER, parse_only=parse_only)
+
+
+def element_text(element):
+    """
+    Visible text of an element, its parts joined by single spaces.
+
+    get_text(strip=True) alone runs neighbouring cells together
+    ('ProcurementDiesel HSDMinistry'), which whole-word keyword matching
+    then misses.
+    """
+    return element.get_text(' ', strip=True)
+
+
+if __name__ == "__main__":
+    from utils.keyword_matcher import KEYWORDS
+
+    # Self-check: a multi-cell listing row still matches tender and product keywords
+    row = parse_html('<table><tr><td>Procurement</td><td>Diesel HSD</td>'
+                     '<td>Ministry of Defence</td></tr></table>').find('tr')
+    text = element_text(row)
+    hits = KEYWORDS.match(text)
+    assert text == 'Procurement Diesel HSD Ministry of Defence', text
+    assert hits.any('tender') and hits.products == ['HSD'], hits
+    print(f"✅ Multi-cell row matches: {dict(hits)}")
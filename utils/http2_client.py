@@ -0,0 +1,199 @@
+"""
+Optional HTTP/2 client for multi-page crawls of one portal
+Multiplexes requests to the same host over a single connection (needs httpx[http2])
+"""
+
+import asyncio
+from urllib.parse import urlparse
+
+from config import REQUEST_TIMEOUT, MAX_RESPONSE_BYTES, MAX_RETRIES, HTTP2_MAX_STREAMS
+from utils.compliance import DEFAULT_HEADERS, ACCEPTED_CONTENT_TYPES, RETRY_STATUSES
+
+try:
+    import httpx
+    import h2  # noqa: F401  (httpx needs it for http2=True)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTP2_AVAILABLE = False
+
+
+class Http2Client:
+    """
+    Fetch many URLs with one HTTP/2 connection per host.
+
+    Politeness is unchanged: every request still passes robots.txt, the
+    domain's circuit breaker and its rate-limit bucket. What changes is that
+    a request no longer waits for the previous one to finish - once its
+    token is granted it goes out as a new stream on the shared connection,
+    so a crawl costs (pages / rate) seconds instead of pages x round trip.
+    Responses get the same `not_modified` flag as ComplianceChecker's and
+    go through its HTTP cache and archive. Redirects are followed, and
+    failures are retried, refused or fed to the breaker exactly as in
+    ComplianceChecker._fetch.
+    """
+
+    def __init__(self, compliance_checker, max_streams=HTTP2_MAX_STREAMS):
+        if not HTTP2_AVAILABLE:
+            raise RuntimeError("HTTP/2 needs httpx with HTTP/2 support: pip install 'httpx[http2]'")
+        self.checker = compliance_checker
+        self.max_streams = max_streams
+
+    def fetch_all(self, urls, max_bytes=None):
+        """
+        Fetch urls concurrently and return {url: response or None}.
+
+        max_bytes is a cap for every URL or a {url: cap} dict. A fetch that
+        raises yields its exception instance, like FetchEngine.fetch_all.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        return asyncio.run(self._fetch_all(urls, max_bytes))
+
+    async def _fetch_all(self, urls, max_bytes):
+        loop = asyncio.get_running_loop()
+        clients = {}  # domain -> (httpx.AsyncClient, stream semaphore)
+
+        def client_for(domain):
+            if domain not in clients:
+                clients[domain] = (
+                    httpx.AsyncClient(http2=True, headers=DEFAULT_HEADERS, timeout=REQUEST_TIMEOUT,
+                                      follow_redirects=True, limits=httpx.Limits(max_connections=1)),
+                    asyncio.Semaphore(self.max_streams)
+                )
+            return clients[domain]
+
+        async def run(url):
+            try:
+                cap = max_bytes.get(url) if isinstance(max_bytes, dict) else max_bytes
+                return await self._fetch(loop, client_for, url, cap or MAX_RESPONSE_BYTES)
+            except Exception as e:
+                return e
+
+        try:
+            results = await asyncio.gather(*(run(url) for url in urls))
+        finally:
+            for client, _ in clients.values():
+                await client.aclose()
+
+        return dict(zip(urls, results))
+
+    async def _fetch(self, loop, client_for, url, max_bytes):
+        checker = self.checker
+        if checker.replaying:
+            return checker.make_request(url)
+
+        parsed = urlparse(url)
+        domain = f"{parsed.scheme}://{parsed.netloc}"
+
+        # robots.txt may need a (blocking) fetch the first time
+        if not await loop.run_in_executor(None, checker.check_robots_txt, url):
+            print(f"❌ Skipping {url} - blocked by robots.txt")
+            return None
+        if not checker.get_breaker(domain).allow():
+            print(f"⛔ Skipping {url} - circuit open for {domain}")
+            return None
+
+        waited = await checker.limiter.acquire_async(domain)
+        if waited > 0:
+            print(f"⏳ Rate limited {domain}: waited {waited:.2f}s")
+
+        headers = checker.http_cache.validators(url) if checker.http_cache else {}
+        client, streams = client_for(domain)
+        error = None
+        retry_after = None
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                # Same pacing as ComplianceChecker: backoff, never sooner than
+                # the crawl delay, and a token from the domain's bucket
+                delay = max(checker._backoff(attempt, retry_after), checker.limiter.interval(domain))
+                print(f"🔁 Retry {attempt}/{MAX_RETRIES} for {url} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                await checker.limiter.acquire_async(domain)
+                retry_after = None
+
+            async with streams:
+                print(f"🌐 Fetching (h2): {url}")
+                try:
+                    response = await self._get(client, url, headers, max_bytes)
+                except httpx.TimeoutException:
+                    error = "timeout"
+                    print(f"❌ Request timeout for {url}")
+                    continue
+                except httpx.TransportError as e:
+                    error = str(e)
+                    print(f"❌ Connection failed for {url}: {e}")
+                    continue
+                except httpx.HTTPError as e:
+                    print(f"❌ Request failed for {url}: {e}")
+                    checker._record_outcome(domain, str(e))
+                    return None
+
+            if response is None:
+                print(f"❌ Refused {url}: too large or unsupported content type")
+                checker._record_transfer(domain, 0, rejected=True)
+                checker._record_outcome(domain)
+                return None
+
+            if response.status_code == 304 and checker.http_cache:
+                cached = checker._cached_response(url)
+                if cached is not None:
+                    print(f"✓ Response: 304 Not Modified (served {len(cached.content)} bytes from cache)")
+                    checker._record_transfer(domain, 0)
+                    checker._record_outcome(domain)
+                    return cached
+
+            if response.status_code in RETRY_STATUSES:
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get('Retry-After')
+                retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+                continue
+
+            if not 200 <= response.status_code < 300:
+                print(f"❌ HTTP error for {url}: {response.status_code}")
+                checker._record_outcome(domain, f"HTTP {response.status_code}")
+                return None
+
+            response.not_modified = False
+            checker._record_transfer(domain, len(response.content))
+            checker.defer_cache(url, response)
+            if checker.archive:
+                checker.archive.save(url, response)
+
+            print(f"✓ Response: {response.status_code} {response.http_version} ({len(response.content)} bytes)")
+            checker._record_outcome(domain)
+            return response
+
+        print(f"❌ Giving up on {url} after {MAX_RETRIES + 1} attempts ({error})")
+        checker._record_outcome(domain, error)
+        return None
+
+    @staticmethod
+    async def _get(client, url, headers, max_bytes):
+        """
+        Streamed GET with the same size / content-type limits as make_request.
+        Bodies of non-2xx responses are never read; the caller only needs the
+        status and headers.
+        """
+        async with client.stream('GET', url, headers=headers) as response:
+            if not 200 <= response.status_code < 300:
+                return response
+
+            content_type = response.headers.get('Content-Type', '').lower()
+            if content_type and not any(t in content_type for t in ACCEPTED_CONTENT_TYPES):
+                return None
+
+            declared = response.headers.get('Content-Length')
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                return None
+
+            chunks = []
+            size = 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > max_bytes:
+                    return None
+                chunks.append(chunk)
+            response._content = b''.join(chunks)
+            return response
@@ -0,0 +1,113 @@
+"""
+HTTP archive for record/replay runs
+Records every response the scrapers receive into one SQLite file (zlib-compressed
+bodies) and serves them back later with no network access
+
+Usage:
+    HTTP_ARCHIVE_MODE=record python scraper.py --once   # capture a cycle
+    HTTP_ARCHIVE_MODE=replay python scraper.py --once   # replay it offline
+    python -m utils.http_archive hp_pulse_http.archive  # list contents
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+# Only headers the scrapers (and the HTTP cache) look at are kept
+ARCHIVED_HEADERS = ('content-type', 'etag', 'last-modified')
+
+
+class HttpArchive:
+    """One row per URL; a later recording of the same URL replaces the earlier one"""
+
+    def __init__(self, path, mode=REPLAY):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown archive mode: {mode!r}")
+        if mode == REPLAY and not os.path.exists(path):
+            raise FileNotFoundError(f"No HTTP archive to replay at {path}")
+        self.path = path
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS responses
+                             (url TEXT PRIMARY KEY,
+                              status INTEGER,
+                              headers TEXT,
+                              encoding TEXT,
+                              body BLOB,
+                              size INTEGER,
+                              recorded_at TEXT)''')
+        self.conn.commit()
+        print(f"📼 HTTP archive ({mode}): {path}")
+
+    @property
+    def replaying(self):
+        return self.mode == REPLAY
+
+    def save(self, url, response):
+        """Record a response (the full decoded body, as the scrapers saw it)"""
+        headers = {k: v for k, v in response.headers.items() if k.lower() in ARCHIVED_HEADERS}
+        body = response.content
+        with self.lock:
+            self.conn.execute('''INSERT OR REPLACE INTO responses
+                                 (url, status, headers, encoding, body, size, recorded_at)
+                                 VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                              (url, response.status_code, json.dumps(headers), response.encoding,
+                               zlib.compress(body), len(body), datetime.now().isoformat()))
+            self.conn.commit()
+
+    def load(self, url):
+        """Rebuild the recorded response for url, or None if it was never recorded"""
+        with self.lock:
+            row = self.conn.execute('''SELECT status, headers, encoding, body
+                                       FROM responses WHERE url = ?''', (url,)).fetchone()
+        if row is None:
+            return None
+
+        status, headers, encoding, body = row
+        response = requests.Response()
+        response.status_code = status
+        response.url = url
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        response.encoding = encoding
+        response._content = zlib.decompress(body)
+        response.not_modified = False
+        return response
+
+    def summary(self):
+        """(responses, raw bytes, stored bytes)"""
+        with self.lock:
+            return self.conn.execute('''SELECT COUNT(*), IFNULL(SUM(size), 0),
+                                               IFNULL(SUM(LENGTH(body)), 0)
+                                        FROM responses''').fetchone()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from config import HTTP_ARCHIVE_PATH
+
+    parser = argparse.ArgumentParser(description="Inspect a recorded HTTP archive")
+    parser.add_argument('file', nargs='?', default=HTTP_ARCHIVE_PATH)
+    args = parser.parse_args()
+
+    archive = HttpArchive(args.file, mode=REPLAY)
+    for url, status, size, recorded_at in archive.conn.execute(
+            "SELECT url, status, size, recorded_at FROM responses ORDER BY recorded_at"):
+        print(f"   {status}  {size:>10,}  {recorded_at[:19]}  {url}")
+    count, raw, stored = archive.summary()
+    print(f"📊 {count} responses, {raw:,} bytes ({stored:,} stored)")
+    archive.close()
@@ -0,0 +1,86 @@
+"""
+On-disk HTTP cache for conditional GETs
+Stores the last body and validators (ETag / Last-Modified) per URL
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+
+class HttpCache:
+    """One metadata file + one body file per URL, keyed by SHA-1 of the URL"""
+
+    def __init__(self, cache_dir='.http_cache'):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.body'
+
+    def get(self, url):
+        """Cached metadata for url, or None"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(body_path):
+            return None
+        return entry
+
+    def validators(self, url):
+        """Conditional request headers for url (empty if nothing cached)"""
+        entry = self.get(url)
+        if not entry:
+            return {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def load_body(self, url):
+        _, body_path = self._paths(url)
+        with open(body_path, 'rb') as f:
+            return f.read()
+
+    def store(self, url, response):
+        """Cache a 200 response if the server gave us a validator to revalidate with"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return False
+
+        entry = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': {k: v for k, v in response.headers.items()
+                        if k.lower() in ('content-type', 'etag', 'last-modified')},
+            'encoding': response.encoding,
+            'fetched_at': datetime.now().isoformat()
+        }
+
+        meta_path, body_path = self._paths(url)
+        self._write_atomic(body_path, response.content)
+        self._write_atomic(meta_path, json.dumps(entry).encode('utf-8'))
+        return True
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
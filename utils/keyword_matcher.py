@@ -0,0 +1,112 @@
+"""
+Keyword / product matcher for relevance checks
+All configured keywords compiled once into a single regex automaton
+"""
+
+import re
+
+from config import (FUEL_KEYWORDS, OPERATIONAL_KEYWORDS, TENDER_KEYWORDS,
+                    SECTOR_KEYWORDS, HPCL_PRODUCTS)
+
+
+def _trie_pattern(words):
+    """
+    Regex for a set of words with shared prefixes factored out, e.g.
+    ['furnace', 'furnace oil', 'fuel'] -> 'fu(?:rnace(?: oil)?|el)'.
+    Each position is then tried against one branch per distinct next
+    character instead of every keyword, and the greedy optional tails
+    make the longest keyword win.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}  # end of a keyword
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+def lower_aligned(text):
+    """text.lower(), keeping offsets valid for slicing the original text"""
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # A few characters grow when lower-cased; leave those as they are
+        lowered = ''.join(c if len(c.lower()) != 1 else c.lower() for c in text)
+    return lowered
+
+
+class KeywordHits(dict):
+    """group -> keywords found, in configured spelling and first-seen order"""
+
+    def any(self, *groups):
+        """True if any of the groups had a hit"""
+        return any(self.get(group) for group in groups)
+
+    @property
+    def products(self):
+        """HPCL products mentioned (for leads.products_mentioned)"""
+        return self.get('product', [])
+
+
+class KeywordMatcher:
+    """
+    Matches many keyword groups in one pass over the text.
+
+    Matching is on whole words: 'MS' does not hit inside 'terms'. Two-letter
+    acronyms (MS, FO) must appear in capitals, since 'Ms.' and 'fo' are not
+    them; other keywords, longer acronyms such as HSD and LPG included, are
+    case-insensitive and also match a plural 's'/'es'.
+    Overlapping keywords resolve to the longest ('furnace oil', not
+    'furnace').
+    """
+
+    def __init__(self, groups):
+        self.keywords = {}     # lower-cased keyword -> [(group, configured spelling)]
+        self.acronyms = set()  # lower-cased keywords that must appear in capitals
+        for group, words in groups.items():
+            for word in words:
+                key = word.lower()
+                if word.isupper() and len(word) <= 2:
+                    self.acronyms.add(key)
+                entries = self.keywords.setdefault(key, [])
+                if all(g != group for g, _ in entries):
+                    entries.append((group, word))
+
+        self.pattern = re.compile(r'\b(' + _trie_pattern(self.keywords) + r')(?:e?s)?\b')
+
+    def match(self, text):
+        """All groups hit in text, as KeywordHits"""
+        text = text or ''
+        lowered = lower_aligned(text)
+
+        hits = KeywordHits()
+        seen = set()
+        for match in self.pattern.finditer(lowered):
+            key = match.group(1)
+            if key in self.acronyms and (match.end() != match.end(1)
+                                         or not text[match.start(1):match.end(1)].isupper()):
+                continue  # 'Ms.' / 'fo' / 'MSs' are not the acronym
+            if key in seen:
+                continue
+            seen.add(key)
+            for group, spelling in self.keywords[key]:
+                hits.setdefault(group, []).append(spelling)
+        return hits
+
+
+# Shared matcher over every configured keyword list, built once at import
+KEYWORDS = KeywordMatcher({
+    'fuel': FUEL_KEYWORDS,
+    'operational': OPERATIONAL_KEYWORDS,
+    'tender': TENDER_KEYWORDS,
+    'sector': SECTOR_KEYWORDS,
+    'product': [name for names in HPCL_PRODUCTS.values() for name in names],
+})
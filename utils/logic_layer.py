@@ -0,0 +1,319 @@
+"""
+Logic-layer hand-off format (FINAL_LOGIC_LAYER_DATA.json)
+Streaming export from the database and batched bulk import back into it
+
+Usage:
+    python -m utils.logic_layer export FINAL_LOGIC_LAYER_DATA.json
+    python -m utils.logic_layer import FINAL_LOGIC_LAYER_DATA.json
+"""
+
+import json
+import re
+from datetime import datetime
+
+from utils.database import Database, connect_readonly
+
+FORMAT_VERSION = '1.0'
+
+# Structured tender fields <-> "Label: value" lines in leads.signal_text
+TENDER_FIELDS = [
+    ('organization', 'Organization'),
+    ('reference', 'Reference No'),
+    ('published_date', 'Published Date'),
+    ('closing_date', 'Closing Date'),
+    ('opening_date', 'Opening Date'),
+    ('portal', 'Portal'),
+]
+
+_LABEL_TO_FIELD = {label.lower(): field for field, label in TENDER_FIELDS}
+_LABEL_TO_FIELD['published'] = 'published_date'  # EnhancedTenderScraper wording
+_FIELD_LINE = re.compile(r'^\s*([A-Za-z ]+?)\s*:\s*(.+?)\s*$')
+
+# Reference numbers the scrapers write when a tender has none
+_PLACEHOLDER_REFERENCES = {'', 'n/a', 'na', '-', 'none'}
+
+
+def tender_fields(signal_text):
+    """Split a tender's signal text into the nested logic-layer fields"""
+    lines = (signal_text or '').strip().split('\n')
+    tender = {'title': lines[0].strip() if lines else ''}
+
+    for line in lines[1:]:
+        match = _FIELD_LINE.match(line)
+        if match:
+            field = _LABEL_TO_FIELD.get(match.group(1).lower())
+            if field:
+                tender[field] = match.group(2)
+
+    return tender
+
+
+def tender_signal_text(tender):
+    """Rebuild the signal text the scrapers would have stored for a tender"""
+    lines = [f"{label}: {tender[field]}" for field, label in TENDER_FIELDS if tender.get(field)]
+    title = tender.get('title', '')
+    return f"{title}\n\n" + '\n'.join(lines) if lines else title
+
+
+def _indented(value, level):
+    """json.dumps with indent=2, shifted to sit at the given nesting level"""
+    return json.dumps(value, indent=2, ensure_ascii=False).replace('\n', '\n' + '  ' * level)
+
+
+def export_logic_layer(filename, db_path='hp_pulse.db', chunk_size=1000):
+    """
+    Write the logic-layer JSON file without materialising all leads.
+
+    Summary figures come from aggregate queries; companies and leads are
+    streamed from cursors and written one item at a time.
+    """
+    conn = connect_readonly(db_path)
+    c = conn.cursor()
+
+    total_leads = c.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+    by_type = dict(c.execute("""
+        SELECT signal_type, COUNT(*) FROM leads
+        GROUP BY signal_type ORDER BY COUNT(*) DESC
+    """).fetchall())
+    unique_companies = c.execute("""
+        SELECT COUNT(DISTINCT c.name) FROM leads l JOIN companies c ON l.company_id = c.id
+    """).fetchone()[0]
+
+    metadata = {
+        'export_timestamp': datetime.now().astimezone().isoformat(timespec='seconds'),
+        'source': 'HP-Pulse Scraper - Real Data',
+        'version': FORMAT_VERSION,
+        'purpose': 'Logic Layer Integration'
+    }
+
+    exported = 0
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write('{\n  "metadata": ' + _indented(metadata, 1) + ',\n')
+        f.write('  "summary": {\n')
+        f.write(f'    "total_leads": {total_leads},\n')
+        f.write('    "by_type": ' + _indented(by_type, 2) + ',\n')
+
+        # Companies list, streamed
+        f.write('    "companies": [')
+        c.execute("""
+            SELECT DISTINCT c.name FROM companies c
+            WHERE EXISTS (SELECT 1 FROM leads l WHERE l.company_id = c.id)
+            ORDER BY c.name
+        """)
+        separator = '\n'
+        for (name,) in c:
+            f.write(separator + '      ' + json.dumps(name, ensure_ascii=False))
+            separator = ',\n'
+        f.write('\n    ],\n' if separator != '\n' else '],\n')
+        f.write(f'    "unique_companies": {unique_companies}\n  }},\n')
+
+        # Leads, streamed in id order
+        f.write('  "leads_data": [')
+        c.execute("""
+            SELECT l.id, l.signal_type, c.name, c.industry, l.source_name,
+                   l.source_url, l.confidence, l.scraped_at, l.signal_text
+            FROM leads l
+            LEFT JOIN companies c ON l.company_id = c.id
+            ORDER BY l.id
+        """)
+        separator = '\n'
+        rows = c.fetchmany(chunk_size)
+        while rows:
+            for (lead_id, signal_type, company, industry, source, url,
+                 confidence, timestamp, signal_text) in rows:
+                lead = {
+                    'id': lead_id,
+                    'type': signal_type,
+                    'company': company,
+                    'industry': industry,
+                    'source': source,
+                    'url': url,
+                    'confidence': confidence,
+                    'timestamp': timestamp,
+                }
+                if signal_type == 'tender':
+                    lead['tender'] = tender_fields(signal_text)
+                else:
+                    lead['text'] = signal_text
+
+                f.write(separator + '    ' + _indented(lead, 2))
+                separator = ',\n'
+                exported += 1
+            rows = c.fetchmany(chunk_size)
+        f.write('\n  ]\n}\n' if separator != '\n' else ']\n}\n')
+
+    conn.close()
+    print(f"✅ Exported {exported} leads to {filename}")
+    return exported
+
+
+class _JsonStream:
+    """Minimal incremental reader for one top-level JSON object"""
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Drop consumed input and append the next chunk; False at EOF"""
+        chunk = self.f.read(self.chunk_size)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return bool(chunk)
+
+    def peek(self):
+        """Next non-whitespace character (without consuming it), or '' at EOF"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number at the buffer edge may be truncated; make sure it ended
+                if end < len(self.buf) or not self._fill():
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+    def items(self):
+        """Iterate the keys of the top-level object; the caller must consume each value"""
+        self.expect('{')
+        if self.peek() == '}':
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect('}')
+            return
+
+    def array(self):
+        """Iterate the elements of the array at the current position"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+
+def iter_logic_layer_leads(filename):
+    """Yield leads_data entries from a logic-layer file one at a time"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        stream = _JsonStream(f)
+        for key in stream.items():
+            if key == 'leads_data':
+                yield from stream.array()
+            else:
+                stream.value()  # metadata / summary are small
+
+
+def import_logic_layer(db, filename, batch_size=5000):
+    """
+    Load a logic-layer file into the database with batched inserts.
+
+    Leads keep their original timestamps; ids are reassigned. Leads already
+    present (same fingerprint) are skipped.
+    """
+    conn = db.get_connection()
+    sql = '''INSERT OR IGNORE INTO leads
+             (company_id, signal_text, signal_type, source_name, source_url,
+              confidence, scraped_at, fingerprint, last_seen_at)
+             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+
+    read = 0
+    inserted = 0
+    batch = []
+
+    def write(rows):
+        with db.transaction():
+            # rowcount excludes rows written by the rollup/FTS triggers
+            return conn.executemany(sql, rows).rowcount
+
+    for lead in iter_logic_layer_leads(filename):
+        signal_type = lead.get('type') or 'unknown'
+        tender = lead.get('tender')
+        if tender is not None:
+            signal_text = tender_signal_text(tender)
+            # Same key as the scrapers: the reference, else organisation + title,
+            # else (no organisation either) the default URL + title fingerprint
+            reference = (tender.get('reference') or '').strip()
+            if reference.lower() not in _PLACEHOLDER_REFERENCES:
+                dedupe_key = reference
+            elif tender.get('organization'):
+                dedupe_key = f"{tender['organization']} {tender.get('title') or ''}"
+            else:
+                dedupe_key = None
+        else:
+            signal_text = lead.get('text') or ''
+            dedupe_key = None
+
+        timestamp = lead.get('timestamp') or datetime.now().isoformat()
+        company_id = db.insert_company(
+            name=lead.get('company') or 'Unknown Company',
+            industry=lead.get('industry')
+        )
+
+        batch.append((
+            company_id, signal_text, signal_type, lead.get('source'), lead.get('url'),
+            lead.get('confidence'), timestamp,
+            db.lead_fingerprint(signal_type, lead.get('url'), signal_text, dedupe_key),
+            timestamp
+        ))
+        read += 1
+
+        if len(batch) >= batch_size:
+            inserted += write(batch)
+            batch = []
+
+    if batch:
+        inserted += write(batch)
+
+    print(f"✅ Imported {inserted} of {read} leads from {filename}")
+    return inserted
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from config import DATABASE_PATH
+
+    parser = argparse.ArgumentParser(description="Logic-layer JSON export/import")
+    parser.add_argument('action', choices=['export', 'import'])
+    parser.add_argument('file', nargs='?', default='FINAL_LOGIC_LAYER_DATA.json')
+    parser.add_argument('--db', default=DATABASE_PATH, help="database path")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.action == 'export':
+        export_logic_layer(args.file, db_path=args.db)
+    else:
+        database = Database(args.db)
+        import_logic_layer(database, args.file, batch_size=args.batch_size)
+        database.close()
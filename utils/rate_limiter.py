@@ -0,0 +1,114 @@
+"""
+Per-domain token-bucket rate limiter
+Usable from threads (acquire) and from asyncio (acquire_async)
+"""
+
+import asyncio
+import threading
+import time
+
+from config import REQUESTS_PER_SECOND
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens/second, holding at most `capacity`.
+
+    reserve() never blocks: it takes a token (possibly going into debt) and
+    returns how long the caller must wait before using it, so no lock is held
+    while sleeping and waiters are served in arrival order.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def reserve(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class RateLimiter:
+    """Token bucket per domain, defaulting to REQUESTS_PER_SECOND"""
+
+    def __init__(self, default_rate=REQUESTS_PER_SECOND, burst=1):
+        self.default_rate = default_rate
+        self.burst = burst
+        self.buckets = {}   # domain -> TokenBucket
+        self.metrics = {}   # domain -> wait-time counters
+        self.lock = threading.Lock()
+
+    def _bucket(self, domain):
+        with self.lock:
+            bucket = self.buckets.get(domain)
+            if bucket is None:
+                bucket = TokenBucket(self.default_rate, self.burst)
+                self.buckets[domain] = bucket
+                self.metrics[domain] = {'requests': 0, 'waits': 0,
+                                        'total_wait': 0.0, 'max_wait': 0.0}
+            return bucket
+
+    def set_domain_rate(self, domain, crawl_delay=None, request_rate=None):
+        """
+        Slow a domain down to what its robots.txt asks for.
+
+        crawl_delay is seconds between requests; request_rate is a
+        (requests, seconds) pair. The configured rate is never exceeded.
+        """
+        rate = self.default_rate
+        if crawl_delay:
+            rate = min(rate, 1.0 / float(crawl_delay))
+        if request_rate and request_rate[0] and request_rate[1]:
+            rate = min(rate, request_rate[0] / float(request_rate[1]))
+        self._bucket(domain).set_rate(rate)
+        return rate
+
+    def interval(self, domain):
+        """Minimum spacing between requests to domain (its Crawl-delay, if any)"""
+        return 1.0 / self._bucket(domain).rate
+
+    def _reserve(self, domain):
+        wait = self._bucket(domain).reserve()
+        with self.lock:
+            stats = self.metrics[domain]
+            stats['requests'] += 1
+            if wait > 0:
+                stats['waits'] += 1
+                stats['total_wait'] += wait
+                stats['max_wait'] = max(stats['max_wait'], wait)
+        return wait
+
+    def acquire(self, domain):
+        """Block the calling thread until a request to domain is allowed; returns the wait"""
+        wait = self._reserve(domain)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, domain):
+        """Asyncio version of acquire(); yields to the loop while waiting"""
+        wait = self._reserve(domain)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self):
+        """Snapshot of per-domain request/wait counters"""
+        with self.lock:
+            return {domain: dict(stats) for domain, stats in self.metrics.items()}
@@ -0,0 +1,199 @@
+"""
+Write-behind queue for scraper database writes
+Lets fetch/parse work overlap with persistence
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.company_names import canonical_name
+
+# Control markers passed through the queue
+_FLUSH = object()
+_STOP = object()
+
+
+class CompanyRef:
+    """Placeholder for a company id that the writer thread has not resolved yet"""
+
+    def __init__(self):
+        self.id = None
+
+
+class WriteBehindWriter:
+    """
+    Drop-in replacement for Database in the scrapers.
+
+    insert_company / insert_lead / touch_source_leads / log_scrape /
+    after_commit are queued on a bounded queue and applied by a background
+    thread in batches, each batch committed in one transaction. A batch is written once it reaches batch_size operations
+    or flush_interval seconds after its first operation, whichever is first.
+    A full queue blocks the caller (backpressure).
+    """
+
+    def __init__(self, db, max_queue=1000, batch_size=200, flush_interval=2.0):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._writes_failed = False  # a write failed since the last after_commit op
+
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+        print("✅ Write-behind writer started")
+
+    # ------------------------------------------------------------------
+    # Database-compatible write API
+    # ------------------------------------------------------------------
+
+    def insert_company(self, name, industry=None, location=None, website=None):
+        """Queue a company insert; returns its id if cached, else a CompanyRef"""
+        company_id = self.db._get_cached_company_id(canonical_name(name))
+        if company_id is not None:
+            return company_id
+
+        ref = CompanyRef()
+        self._put(('company', ref, (name, industry, location, website), {}))
+        return ref
+
+    def insert_lead(self, company_id, signal_text, signal_type, source_name,
+                    source_url, products=None, confidence=0.0, dedupe_key=None):
+        """Queue a lead insert (the lead id is not available to the caller)"""
+        self._put(('lead', None,
+                   (company_id, signal_text, signal_type, source_name, source_url),
+                   {'products': products, 'confidence': confidence,
+                    'dedupe_key': dedupe_key}))
+
+    def touch_source_leads(self, source_name):
+        """Queue a last_seen_at refresh of a source's leads (see Database)"""
+        self._put(('touch', None, (source_name,), {}))
+
+    def log_scrape(self, source_name, source_type, status, items_found, error=None):
+        """Queue a scrape log entry"""
+        self._put(('log', None,
+                   (source_name, source_type, status, items_found),
+                   {'error': error}))
+
+    def after_commit(self, callback, *args):
+        """
+        Queue callback(*args), run by the writer thread once everything
+        queued before it is committed. Skipped if any of those writes failed.
+        """
+        self._put(('call', None, (callback,) + args, {}))
+
+    @contextmanager
+    def transaction(self):
+        """Writes are already batched by the writer thread; kept for API compatibility"""
+        yield self
+
+    # ------------------------------------------------------------------
+    # Reads see everything queued so far
+    # ------------------------------------------------------------------
+
+    def get_stats(self):
+        self.flush()
+        return self.db.get_stats()
+
+    def get_recent_leads(self, limit=10):
+        self.flush()
+        return self.db.get_recent_leads(limit)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def flush(self):
+        """Block until every queued write has been committed"""
+        if self._closed:
+            return
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        if self._closed:
+            return
+        self._queue.put(_STOP)
+        self._closed = True
+        self._thread.join()
+        print("💾 Write-behind writer flushed and stopped")
+
+    def _put(self, op):
+        if self._closed:
+            raise RuntimeError("Write-behind writer is closed")
+        self._queue.put(op)
+
+    def _run(self):
+        """Writer thread: collect batches and apply each in one transaction"""
+        stopping = False
+        try:
+            while not stopping:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.flush_interval
+
+                while (len(batch) < self.batch_size
+                       and batch[-1] is not _FLUSH and batch[-1] is not _STOP):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+
+                stopping = batch[-1] is _STOP
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    print(f"❌ Write-behind batch failed: {e}")
+
+                for _ in batch:
+                    self._queue.task_done()
+        finally:
+            # The writer thread owns its own connection
+            self.db.close()
+
+    def _write_batch(self, batch):
+        ops = [op for op in batch if op is not _FLUSH and op is not _STOP]
+        if not ops:
+            return
+
+        callbacks = []
+        with self.db.transaction():
+            for kind, ref, args, kwargs in ops:
+                try:
+                    if kind == 'company':
+                        ref.id = self.db.insert_company(*args, **kwargs)
+                    elif kind == 'lead':
+                        company_id = args[0]
+                        if isinstance(company_id, CompanyRef):
+                            company_id = company_id.id
+                            if company_id is None:
+                                # Its company insert failed; don't store an orphan lead
+                                print(f"⚠️  Write-behind lead skipped, company insert failed: {args[4]}")
+                                self._writes_failed = True
+                                continue
+                        self.db.insert_lead(company_id, *args[1:], **kwargs)
+                    elif kind == 'touch':
+                        self.db.touch_source_leads(*args, **kwargs)
+                    elif kind == 'log':
+                        self.db.log_scrape(*args, **kwargs)
+                    elif kind == 'call':
+                        if self._writes_failed:
+                            print(f"⚠️  Write-behind skipped {args[0].__name__}: earlier writes failed")
+                        else:
+                            callbacks.append(args)
+                        self._writes_failed = False
+                except Exception as e:
+                    print(f"❌ Write-behind {kind} failed: {e}")
+                    self._writes_failed = True
+
+        # Only once the batch is committed
+        for callback, *args in callbacks:
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"❌ Write-behind {callback.__name__} failed: {e}")